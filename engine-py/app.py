@@ -10,39 +10,52 @@ Self-healing AI service with:
 """
 
 import os
-import json
-import re
+import functools
 import logging
+import asyncio
 import httpx
+import orjson
 import time
+import random
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel, validator
 from typing import Optional, List
-from datetime import datetime
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 
 from config import (
-    OPENROUTER_API_KEY, GEMINI_API_KEY, LLM_MODEL, GEMINI_MODEL, ALLOWED_STEPS,
-    GROQ_API_KEY, GROQ_MODEL, HUGGINGFACE_API_KEY, HUGGINGFACE_MODEL
+    OPENROUTER_API_KEY, GEMINI_API_KEY, OPENROUTER_API_KEYS, GEMINI_API_KEYS,
+    API_KEY_COOLDOWN_SECONDS, CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_SECONDS, GROQ_RPM, WEB_CONCURRENCY, LLM_MODEL, GEMINI_MODEL, ALLOWED_STEPS,
+    GROQ_API_KEY, GROQ_MODEL, HUGGINGFACE_API_KEY, HUGGINGFACE_MODEL,
+    LLM_HEDGE_DELAY_SECONDS, LLM_MAX_HEDGES, LLM_COALESCE_ENABLED, LLM_WARMUP_CONNECTIONS, LLM_KEEPALIVE_SECONDS,
+    BACKEND_URL, REGISTRY_REFRESH_SECONDS, MAX_USER_TEXT_CHARS, MAX_PROMPT_CHARS,
+    FAST_PATH_ENABLED, LOG_LEVEL
 )
 from prompts import (
-    PARSE_INTENT_PROMPT, 
-    ENTITY_EXTRACTION_PROMPT, 
+    UNIFIED_EXTRACTION_PROMPT,
     TWITTER_RESEARCH_PROMPT,
-    RETRY_CORRECTION_PROMPT,
+    RETRY_CORRECTION_REQUEST_TEMPLATE,
+    build_retry_system_prompt,
     INTENT_ANALYSIS_PROMPT,
     CODE_GENERATION_PROMPT,
-    build_generation_prompt,
+    CLARIFICATION_ANSWERS_PROMPT,
+    GENERATION_REQUEST_TEMPLATE,
+    build_generation_system_prompt,
     fetch_registry,
     get_allowed_tool_names,
     get_tool_prompt_text
 )
 
 from validator import validate_automation, sanitize_automation
+from cache import get_cached, set_cached, get_cached_automation, set_cached_automation, cache_stats
 from clarification import ClarificationHandler
+from fast_path import try_fast_path, try_fast_extract
 from required_fields import normalize_channel_response
 from dynamic_resolver import resolve_capability_gaps
 from sandbox import execute_in_sandbox
+from resilience import ApiKeyPool, CircuitBreaker, TokenBucket, SingleFlight
 
 # ─── Feature Flag ───────────────────────────────────────────────────────
 DYNAMIC_FEATURES_ENABLED = os.getenv("DYNAMIC_FEATURES_ENABLED", "false").lower() == "true"
@@ -53,33 +66,54 @@ OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
 app = FastAPI(
     title="Workflow AI Engine",
     description="Self-healing AI service for automation generation with auto-retry",
-    version="2.0.0"
+    version="2.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
+logging.basicConfig(level=LOG_LEVEL)
 logger = logging.getLogger(__name__)
 
 # ─── Retry Configuration ────────────────────────────────────────────────
 
 RETRY_CONFIG = {
     "max_attempts": 3,
-    "base_delay_seconds": 1,    # 1s, 2s, 4s exponential
+    "base_delay_seconds": 1,    # Decorrelated jitter: uniform(base, min(max, prev * 3))
     "max_delay_seconds": 10,
+    "prev_output_tokens": 600,  # Budget for the failed output quoted in the retry prompt
+    "prev_error_tokens": 150,
 }
 
-# CORS for Node.js backend and frontend communication
+# Rough UTF-8 bytes per token for the providers' BPE tokenizers
+BYTES_PER_TOKEN = 3.5
+
+# Seconds between keep-alive frames on SSE endpoints
+SSE_HEARTBEAT_SECONDS = 5
+
+# Transport-level retry for transient provider errors (per HTTP call)
+HTTP_RETRY_CONFIG = {
+    "max_attempts": 2,
+    "base_delay_seconds": 0.5,
+    "max_delay_seconds": 5,     # Longer Retry-After → give up and let the cascade move on
+    "retry_statuses": {429, 500, 502, 503, 504},
+}
+
+# CORS for Node.js backend and frontend communication.
+# A single anchored regex covers the fixed origins and the *.onrender.com wildcard
+# (Starlette's allow_origins list does not expand wildcards).
+CORS_ORIGIN_REGEX = (
+    r"^(http://localhost:(3000|3001)"
+    r"|https://workflow-automation-green\.vercel\.app"
+    r"|https://[a-z0-9-]+\.onrender\.com)$"
+)
+
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=[
-        "http://localhost:3000",
-        "http://localhost:3001",
-        "https://workflow-automation-green.vercel.app",
-        "https://*.onrender.com",
-    ],
+    allow_origin_regex=CORS_ORIGIN_REGEX,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    max_age=86400,  # Let browsers cache preflight responses for a day
 )
 
 
@@ -87,14 +121,93 @@ app.add_middleware(
 # Startup Event — Load Tool Registry
 # ============================================================
 
+# Long-running tasks started at startup, cancelled at shutdown
+_background_tasks = []
+
+# Wall-clock timestamp reported by /health, refreshed once per second
+_health_timestamp = datetime.now().isoformat()
+
+
+async def _health_tick_loop():
+    """Refresh the /health timestamp once per second instead of per hit."""
+    global _health_timestamp
+    while True:
+        await asyncio.sleep(1)
+        _health_timestamp = datetime.now().isoformat()
+
+
+async def _registry_refresh_loop():
+    """Re-fetch the tool registry periodically, off the request path."""
+    while True:
+        await asyncio.sleep(REGISTRY_REFRESH_SECONDS)
+        try:
+            await asyncio.to_thread(fetch_registry, BACKEND_URL)
+        except Exception as e:
+            logger.warning("⚠️ Background registry refresh failed: %s", e)
+
+
+def _provider_base_urls() -> list:
+    """Base URLs of the LLM providers that have an API key configured."""
+    return [
+        url for url, api_key in (
+            ("https://api.groq.com/", GROQ_API_KEY),
+            ("https://api-inference.huggingface.co/", HUGGINGFACE_API_KEY),
+            ("https://openrouter.ai/api/v1/", OPENROUTER_API_KEY),
+            ("https://generativelanguage.googleapis.com/", GEMINI_API_KEY),
+        )
+        if api_key
+    ]
+
+
+async def _warm_provider_connections(connections_per_host: int):
+    """Open pooled TLS connections to each provider ahead of the first real request."""
+    await asyncio.gather(
+        *(
+            HTTP_CLIENT.head(url, timeout=5.0)
+            for url in _provider_base_urls()
+            for _ in range(connections_per_host)
+        ),
+        return_exceptions=True  # Status codes don't matter, only the open socket
+    )
+
+
+async def _connection_keepalive_loop():
+    """Touch each provider before the pool's keepalive_expiry closes idle sockets."""
+    while True:
+        await asyncio.sleep(LLM_KEEPALIVE_SECONDS)
+        await _warm_provider_connections(1)
+
+
 @app.on_event("startup")
 async def startup_event():
     """Load tool registry from Node.js backend on startup."""
     logger.info("🚀 AI Engine starting up...")
     try:
-        fetch_registry("http://localhost:3000")
+        # Blocking HTTP fetch — run it in a thread so the loop (and warm-up tasks) keep going
+        await asyncio.to_thread(fetch_registry, BACKEND_URL)
     except Exception as e:
-        logger.warning(f"⚠️ Registry fetch failed at startup (will use fallback): {e}")
+        logger.warning("⚠️ Registry fetch failed at startup (will use fallback): %s", e)
+
+    if REGISTRY_REFRESH_SECONDS > 0:
+        _background_tasks.append(asyncio.create_task(_registry_refresh_loop()))
+
+    if not LLM_PROVIDERS:
+        logger.error("❌ No AI provider API keys configured — LLM endpoints will return 500")
+
+    _background_tasks.append(asyncio.create_task(_health_tick_loop()))
+
+    # Pre-open provider connections without delaying startup
+    _background_tasks.append(asyncio.create_task(_warm_provider_connections(LLM_WARMUP_CONNECTIONS)))
+    if LLM_KEEPALIVE_SECONDS > 0:
+        _background_tasks.append(asyncio.create_task(_connection_keepalive_loop()))
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background tasks and release pooled LLM provider connections."""
+    for task in _background_tasks:
+        task.cancel()
+    await HTTP_CLIENT.aclose()
 
 
 # ============================================================
@@ -139,96 +252,406 @@ class DynamicExecuteRequest(BaseModel):
         return v
 
 
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Trim text to roughly max_tokens, measured in UTF-8 bytes so multibyte text
+    isn't under-counted. Never splits a character.
+    """
+    max_bytes = int(max_tokens * BYTES_PER_TOKEN)
+    encoded = text.encode("utf-8")
+    if len(encoded) <= max_bytes:
+        return text
+    return encoded[:max_bytes].decode("utf-8", errors="ignore")
+
+
+def check_text_size(text: str, limit: int = MAX_USER_TEXT_CHARS):
+    """Reject oversized input before it reaches (and is billed by) an LLM."""
+    if len(text) > limit:
+        logger.warning("⚠️ Rejected input of %s chars (limit %s)", len(text), limit)
+        raise HTTPException(
+            status_code=413,
+            detail=f"Input too long: {len(text)} characters (max {limit})"
+        )
+
+
 # ============================================================
 # Helper Functions
 # ============================================================
 
+# Responses beyond this are malformed/runaway output — never worth scanning
+MAX_LLM_RESPONSE_CHARS = 256_000
+
+
+def _find_json_object(text: str) -> Optional[str]:
+    """
+    Return the first balanced {...} object in text using a single linear scan.
+
+    Skips past an opening markdown fence (```json) if present, then tracks
+    brace depth while respecting string and escape state — no regex backtracking.
+    """
+    start = 0
+    fence = text.find("```")
+    if fence != -1:
+        start = fence + 3
+        while start < len(text) and text[start].isalpha():
+            start += 1
+
+    begin = text.find("{", start)
+    if begin == -1:
+        return None
+
+    depth = 0
+    in_string = False
+    escaped = False
+    for i in range(begin, len(text)):
+        ch = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                return text[begin:i + 1]
+
+    return None
+
+
+def _strip_trailing_commas(text: str) -> str:
+    """
+    Drop commas that directly precede a closing } or ] (outside strings) —
+    the most common way LLM JSON is "almost valid". One linear scan.
+    """
+    out = []
+    pending = []  # a held-back comma plus the whitespace after it
+    in_string = False
+    escaped = False
+    for ch in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            out.append(ch)
+            continue
+        if pending:
+            if ch.isspace():
+                pending.append(ch)
+                continue
+            if ch in "}]":
+                out.extend(pending[1:])  # drop the comma, keep the whitespace
+            else:
+                out.extend(pending)
+            pending.clear()
+        if ch == ",":
+            pending.append(ch)
+            continue
+        if ch == '"':
+            in_string = True
+        out.append(ch)
+    out.extend(pending)
+    return "".join(out)
+
+
+class _JsonStreamScanner:
+    """
+    Incremental twin of _find_json_object: fed text chunks as they stream in,
+    reports when the first top-level {...} object has closed.
+    """
+
+    def __init__(self):
+        self.depth = 0
+        self.started = False
+        self.in_string = False
+        self.escaped = False
+
+    def feed(self, chunk: str) -> bool:
+        for ch in chunk:
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif ch == "\\":
+                    self.escaped = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                self.in_string = self.started
+            elif ch == "{":
+                self.started = True
+                self.depth += 1
+            elif ch == "}" and self.started:
+                self.depth -= 1
+                if self.depth == 0:
+                    return True
+        return False
+
+
 def extract_json_from_response(text: str) -> dict:
     """
     Extract JSON from LLM response, handling markdown code blocks.
     """
+    if len(text) > MAX_LLM_RESPONSE_CHARS:
+        raise ValueError(f"LLM response too large to parse ({len(text)} chars)")
     text = text.strip()
     
-    # Try to find JSON in code blocks
-    json_match = re.search(r'```(?:json)?\s*([\s\S]*?)\s*```', text)
-    if json_match:
-        text = json_match.group(1)
+    # Fast path: the response is already a bare JSON object
+    if text.startswith('{') and text.endswith('}'):
+        try:
+            return orjson.loads(text)
+        except orjson.JSONDecodeError:
+            pass
     
-    # Try to find raw JSON object
-    json_match = re.search(r'\{[\s\S]*\}', text)
-    if json_match:
-        text = json_match.group(0)
+    # Find the first balanced JSON object (inside a code block if there is one)
+    candidate = _find_json_object(text) or text
     
     try:
-        return json.loads(text)
-    except json.JSONDecodeError as e:
+        return orjson.loads(candidate)
+    except orjson.JSONDecodeError as e:
+        # Fallback: first '{' to last '}' (what the old greedy regex matched),
+        # found with two O(n) string scans instead of a backtracking pattern
+        first, last = text.find("{"), text.rfind("}")
+        if first != -1 and last > first:
+            greedy = text[first:last + 1]
+            if greedy != candidate:
+                try:
+                    return orjson.loads(greedy)
+                except orjson.JSONDecodeError:
+                    pass
+        # Local repair before the caller spends a whole LLM retry on it
+        repaired = _strip_trailing_commas(candidate)
+        if repaired != candidate:
+            try:
+                return orjson.loads(repaired)
+            except orjson.JSONDecodeError:
+                pass
         raise ValueError(f"Failed to parse JSON: {e}")
 
 
 # ─── LLM Provider URLs ───────────────────────────────────────────────
 GROQ_URL = "https://api.groq.com/openai/v1/chat/completions"
 HUGGINGFACE_URL = "https://api-inference.huggingface.co/models"
+HUGGINGFACE_CHAT_URL = f"{HUGGINGFACE_URL}/{HUGGINGFACE_MODEL}/v1/chat/completions"
+# Gemini authenticates via query string; only the pooled key is appended per request
+GEMINI_MODEL_URL = f"https://generativelanguage.googleapis.com/v1beta/models/{GEMINI_MODEL}"
+GEMINI_GENERATE_URL = f"{GEMINI_MODEL_URL}:generateContent?key="
+GEMINI_STREAM_URL = f"{GEMINI_MODEL_URL}:streamGenerateContent?alt=sse&key="
+
+# Serverless HuggingFace models can cold-start; allow longer than the client's 60s default
+HUGGINGFACE_TIMEOUT_SECONDS = 90.0
+
+# ─── LLM Provider Headers (built once; httpx copies them per request) ─
+GEMINI_HEADERS = {"Content-Type": "application/json"}
+GROQ_HEADERS = {
+    "Authorization": f"Bearer {GROQ_API_KEY}",
+    "Content-Type": "application/json"
+}
+HUGGINGFACE_HEADERS = {
+    "Authorization": f"Bearer {HUGGINGFACE_API_KEY}",
+    "Content-Type": "application/json"
+}
+
 
+@functools.lru_cache(maxsize=32)
+def _openrouter_headers(api_key: str) -> dict:
+    """OpenRouter headers for one pooled key (one dict per key, reused)."""
+    return {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json",
+        "HTTP-Referer": "http://localhost:3000",
+        "X-Title": "Smart Workflow Automation"
+    }
 
-def call_llm(full_prompt: str) -> str:
+# ─── API Key Pools ───────────────────────────────────────────────────
+OPENROUTER_KEYS = ApiKeyPool("OpenRouter", OPENROUTER_API_KEYS, API_KEY_COOLDOWN_SECONDS)
+GEMINI_KEYS = ApiKeyPool("Gemini", GEMINI_API_KEYS, API_KEY_COOLDOWN_SECONDS)
+PROVIDER_KEY_POOLS = {"OpenRouter": OPENROUTER_KEYS, "Gemini": GEMINI_KEYS}
+
+# ─── Provider Circuit Breakers & Rate Caps ───────────────────────────
+PROVIDER_BREAKERS = {
+    name: CircuitBreaker(name, CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_SECONDS)
+    for name in ("Groq", "HuggingFace", "OpenRouter", "Gemini")
+}
+# Buckets are per worker process, so split the service-wide cap between the workers
+PROVIDER_BUCKETS = {
+    "Groq": TokenBucket("Groq", GROQ_RPM / WEB_CONCURRENCY)
+}
+
+
+def _record_provider_failure(name: str, error: Exception):
+    """
+    Feed a failed call into the provider's circuit breaker.
+    For pooled providers a 429 belongs to one key, which the pool has already
+    parked — the circuit only opens once no key is left to rotate to.
+    """
+    if isinstance(error, httpx.HTTPStatusError) and error.response.status_code == 429:
+        key_pool = PROVIDER_KEY_POOLS.get(name)
+        if key_pool is not None and key_pool.has_available_key():
+            return
+        PROVIDER_BREAKERS[name].record_failure(
+            rate_limited=True,
+            retry_after=_retry_after_seconds(error.response)
+        )
+        return
+    PROVIDER_BREAKERS[name].record_failure()
+
+# ─── Shared HTTP Client ──────────────────────────────────────────────
+# One pooled async client for all LLM providers so keep-alive sockets (and their
+# TLS sessions) are reused across calls and LLM round-trips never block the event loop.
+# HTTP/2 multiplexes concurrent calls to the same provider over one connection.
+# Limits are per uvicorn worker (see render.yaml --workers).
+HTTP_CLIENT = httpx.AsyncClient(
+    http2=True,
+    timeout=httpx.Timeout(60.0, connect=5.0),
+    limits=httpx.Limits(max_keepalive_connections=50, max_connections=200, keepalive_expiry=30.0)
+)
+
+
+# Identical prompts arriving while one is already in flight share its result
+LLM_SINGLE_FLIGHT = SingleFlight()
+
+
+async def call_llm(full_prompt: str, system_prompt: Optional[str] = None,
+                   stop_at_json: bool = False) -> str:
+    """
+    Call the LLM provider cascade (see _call_llm_cascade).
+    Concurrent calls with the same prompts are coalesced into one request.
+    """
+    if not LLM_COALESCE_ENABLED:
+        return await _call_llm_cascade(full_prompt, system_prompt, stop_at_json)
+    return await LLM_SINGLE_FLIGHT.run(
+        (full_prompt, system_prompt, stop_at_json),
+        lambda: _call_llm_cascade(full_prompt, system_prompt, stop_at_json)
+    )
+
+
+async def _call_llm_cascade(full_prompt: str, system_prompt: Optional[str] = None,
+                            stop_at_json: bool = False) -> str:
     """
     Call LLM with 4-provider cascade:
     1. Groq (primary — fast & free)
     2. HuggingFace Inference (free)
     3. OpenRouter (fallback)
     4. Google Gemini (last resort)
-    """
-    providers = []
-    errors = {}
 
-    # Build ordered provider list (only if API key is configured)
-    if GROQ_API_KEY:
-        providers.append(("Groq", call_groq, "⚡"))
-    else:
-        errors["Groq"] = "API key not set"
+    Slow providers are hedged: the next provider is started in parallel
+    after LLM_HEDGE_DELAY_SECONDS and whichever answers first is used.
+    At most LLM_MAX_HEDGES extra providers are started this way per call.
+    Providers with an open circuit breaker or an exhausted rate cap are skipped.
 
-    if HUGGINGFACE_API_KEY:
-        providers.append(("HuggingFace", call_huggingface, "🤗"))
-    else:
-        errors["HuggingFace"] = "API key not set"
+    If system_prompt is given it is sent as a separate system message
+    (systemInstruction for Gemini) instead of being concatenated into the prompt.
 
-    if OPENROUTER_API_KEY:
-        providers.append(("OpenRouter", call_openrouter, "🔄"))
-    else:
-        errors["OpenRouter"] = "API key not set"
-
-    if GEMINI_API_KEY:
-        providers.append(("Gemini", call_gemini, "�"))
-    else:
-        errors["Gemini"] = "API key not set"
+    stop_at_json is for callers that only parse a JSON object out of the reply:
+    providers stream the completion and hang up once that object closes.
+    """
+    check_text_size(full_prompt + (system_prompt or ""), MAX_PROMPT_CHARS)
 
-    if not providers:
+    if not LLM_PROVIDERS:
         raise HTTPException(
             status_code=500,
             detail="No AI provider API keys configured. Set at least one of: GEMINI_API_KEY, OPENROUTER_API_KEY, GROQ_API_KEY, HUGGINGFACE_API_KEY"
         )
 
-    # Try each provider in order
-    for i, (name, call_fn, icon) in enumerate(providers):
-        try:
+    providers = LLM_PROVIDERS
+    errors = {}
+
+    # Hedged cascade: start the primary, and if it hasn't answered within
+    # LLM_HEDGE_DELAY_SECONDS (or it fails), start the next provider alongside it.
+    # The first successful response wins and the stragglers are cancelled.
+    queue = list(enumerate(providers))
+    task_names = {}
+    pending = set()
+
+    def launch_next() -> bool:
+        """Start the next usable provider; False if none are left."""
+        while queue:
+            i, (name, call_fn, icon) = queue.pop(0)
+            breaker = PROVIDER_BREAKERS[name]
+            if not breaker.allow():
+                reason = "circuit open after 429" if breaker.rate_limited else "circuit open"
+                errors[name] = f"skipped ({reason})"
+                logger.info("🔌 Skipping %s (%s)", name, reason)
+                continue
+            bucket = PROVIDER_BUCKETS.get(name)
+            if bucket and not bucket.try_acquire():
+                errors[name] = "skipped (local rate cap reached)"
+                logger.info("🪣 Skipping %s (local rate cap reached)", name)
+                continue
             label = "Primary" if i == 0 else f"Fallback #{i}"
-            logger.info(f"{icon} Using {name} ({label})")
-            result = call_fn(full_prompt)
-            logger.info(f"✅ {name} successfully generated response")
-            return result
-        except httpx.HTTPStatusError as e:
-            error_msg = f"HTTP {e.response.status_code}: {e.response.text[:200]}"
-            errors[name] = error_msg
-            if e.response.status_code == 429:
-                logger.warning(f"⚠️ {name} rate limited (429), trying next provider...")
-            else:
-                logger.warning(f"⚠️ {name} failed: {error_msg}")
-        except Exception as e:
-            errors[name] = str(e)
-            logger.warning(f"⚠️ {name} failed: {e}, trying next provider...")
+            logger.info("%s Using %s (%s)", icon, name, label)
+            task = asyncio.create_task(call_fn(full_prompt, system_prompt, stop_at_json))
+            task_names[task] = name
+            pending.add(task)
+            return True
+        return False
+
+    hedge_delay = LLM_HEDGE_DELAY_SECONDS if LLM_HEDGE_DELAY_SECONDS > 0 else None
+    hedges = 0
+    launch_next()
+
+    try:
+        while pending:
+            done, _ = await asyncio.wait(
+                pending,
+                timeout=hedge_delay if queue and hedges < LLM_MAX_HEDGES else None,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+
+            if not done:
+                # Nothing back yet — hedge with the next provider
+                logger.info("⏱️ No response after %ss, hedging with next provider...", hedge_delay)
+                hedges += 1
+                launch_next()
+                continue
+
+            for task in done:
+                pending.discard(task)
+                name = task_names[task]
+                try:
+                    result = task.result()
+                except httpx.HTTPStatusError as e:
+                    error_msg = f"HTTP {e.response.status_code}: {e.response.text[:200]}"
+                    errors[name] = error_msg
+                    _record_provider_failure(name, e)
+                    if e.response.status_code == 429:
+                        logger.warning("⚠️ %s rate limited (429), trying next provider...", name)
+                    else:
+                        logger.warning("⚠️ %s failed: %s", name, error_msg)
+                except Exception as e:
+                    errors[name] = str(e)
+                    _record_provider_failure(name, e)
+                    logger.warning("⚠️ %s failed: %s, trying next provider...", name, e)
+                else:
+                    PROVIDER_BREAKERS[name].record_success()
+                    logger.info("✅ %s successfully generated response", name)
+                    return result
+
+            # Everything in flight has failed — fall through to the next provider now
+            if queue and not pending:
+                launch_next()
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
 
     # All providers failed
-    rate_limited_count = sum(1 for err in errors.values() if "429" in str(err))
+    errors = {**{name: "API key not set" for name in UNCONFIGURED_PROVIDERS}, **errors}
+    # Only real 429s and our own rate cap mean "wait and retry"; circuits opened by
+    # timeouts/5xx are ordinary failures
+    rate_limited_count = sum(
+        1 for err in errors.values()
+        if "429" in str(err) or err == "skipped (local rate cap reached)"
+    )
     configured_count = len(providers)
 
     if rate_limited_count >= configured_count and configured_count > 0:
@@ -246,109 +669,411 @@ def call_llm(full_prompt: str) -> str:
         )
 
 
-def call_openrouter(full_prompt: str) -> str:
-    """Call OpenRouter API"""
-    headers = {
-        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-        "Content-Type": "application/json",
-        "HTTP-Referer": "http://localhost:3000",
-        "X-Title": "Smart Workflow Automation"
-    }
+def _retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    """Parse a Retry-After header (delta-seconds or HTTP date) into seconds."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        # "-0000" dates parse as naive; HTTP dates are always UTC
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
 
-    payload = {
-        "model": LLM_MODEL,
-        "messages": [
+
+def _transient_retry_delay(attempt: int, response: Optional[httpx.Response] = None) -> Optional[float]:
+    """
+    Seconds to wait before retrying a failed provider call, or None to give up now:
+    last attempt, a non-retryable status, or a Retry-After too long to wait out.
+    A None response means a transport error (timeout, connection reset).
+    """
+    max_delay = HTTP_RETRY_CONFIG["max_delay_seconds"]
+    if attempt >= HTTP_RETRY_CONFIG["max_attempts"]:
+        return None
+
+    retry_after = None
+    if response is not None:
+        if response.status_code not in HTTP_RETRY_CONFIG["retry_statuses"]:
+            return None
+        retry_after = _retry_after_seconds(response)
+        if retry_after is not None:
+            # Provider wants a long pause — fail fast so the cascade can move on
+            return retry_after if retry_after <= max_delay else None
+
+    backoff = min(HTTP_RETRY_CONFIG["base_delay_seconds"] * (2 ** (attempt - 1)), max_delay)
+    return backoff + random.uniform(0, backoff / 2)
+
+
+async def post_with_retry(url: str, **kwargs) -> httpx.Response:
+    """
+    POST via the shared client, retrying transient failures (429/5xx, timeouts)
+    with jittered exponential backoff and honoring Retry-After.
+    Raises httpx.HTTPStatusError for non-retryable or exhausted failures.
+    """
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            response = await HTTP_CLIENT.post(url, **kwargs)
+        except httpx.TransportError:
+            delay = _transient_retry_delay(attempt)
+            if delay is None:
+                raise
+        else:
+            delay = _transient_retry_delay(attempt, response)
+            if delay is None:
+                response.raise_for_status()
+                return response
+
+        logger.info("🔁 Transient error from %s, retrying in %.1fs...", httpx.URL(url).host, delay)
+        await asyncio.sleep(delay)
+
+
+async def open_stream_with_retry(url: str, headers: dict, payload: dict,
+                                 timeout: Optional[float] = None) -> httpx.Response:
+    """
+    Streaming twin of post_with_retry: same retries, but only until the response
+    headers arrive — once the body starts flowing, errors are the caller's.
+    The caller must aclose() the returned response.
+    """
+    extra = {"timeout": timeout} if timeout is not None else {}
+    request = HTTP_CLIENT.build_request("POST", url, headers=headers, content=orjson.dumps(payload), **extra)
+
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            response = await HTTP_CLIENT.send(request, stream=True)
+        except httpx.TransportError:
+            delay = _transient_retry_delay(attempt)
+            if delay is None:
+                raise
+        else:
+            if not response.is_error:
+                return response
+            await response.aread()  # so error handlers can read response.text
+            delay = _transient_retry_delay(attempt, response)
+            if delay is None:
+                response.raise_for_status()
+
+        logger.info("🔁 Transient error from %s, retrying in %.1fs...", httpx.URL(url).host, delay)
+        await asyncio.sleep(delay)
+
+
+def _chat_messages(full_prompt: str, system_prompt: Optional[str] = None) -> list:
+    """
+    OpenAI-style message list. Fixed instructions go in a separate system message
+    so the long static prefix is identical across requests (provider prefix caching).
+    """
+    if system_prompt:
+        return [
+            {"role": "system", "content": system_prompt},
             {"role": "user", "content": full_prompt}
         ]
-    }
+    return [{"role": "user", "content": full_prompt}]
 
-    with httpx.Client(timeout=60.0) as client:
-        response = client.post(OPENROUTER_URL, headers=headers, json=payload)
-        response.raise_for_status()
-        result = response.json()
-        return result["choices"][0]["message"]["content"]
 
+def _openrouter_request(full_prompt: str, system_prompt: Optional[str] = None, stream: bool = False,
+                        api_key: Optional[str] = None) -> tuple:
+    """Build (url, headers, payload) for an OpenRouter chat completion."""
+    api_key = api_key or OPENROUTER_KEYS.next_key()
+    payload = {
+        "model": LLM_MODEL,
+        "messages": _chat_messages(full_prompt, system_prompt),
+        "stream": stream
+    }
+
+    return OPENROUTER_URL, _openrouter_headers(api_key), payload
 
-def call_gemini(full_prompt: str) -> str:
-    """Call Google Gemini API"""
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/{GEMINI_MODEL}:generateContent?key={GEMINI_API_KEY}"
 
-    headers = {
-        "Content-Type": "application/json"
-    }
+def _gemini_request(full_prompt: str, system_prompt: Optional[str] = None, stream: bool = False,
+                    api_key: Optional[str] = None) -> tuple:
+    """Build (url, headers, payload) for a Gemini generateContent call."""
+    api_key = api_key or GEMINI_KEYS.next_key()
+    url = (GEMINI_STREAM_URL if stream else GEMINI_GENERATE_URL) + api_key
 
     payload = {
         "contents": [{
             "parts": [{"text": full_prompt}]
         }]
     }
+    if system_prompt:
+        payload["systemInstruction"] = {"parts": [{"text": system_prompt}]}
 
-    with httpx.Client(timeout=60.0) as client:
-        response = client.post(url, headers=headers, json=payload)
-        response.raise_for_status()
-        result = response.json()
-        return result["candidates"][0]["content"]["parts"][0]["text"]
+    return url, GEMINI_HEADERS, payload
 
 
-def call_groq(full_prompt: str) -> str:
-    """
-    Call Groq API (free tier: 30 RPM, 14,400 requests/day).
-    Uses OpenAI-compatible chat completions endpoint.
-    """
-    headers = {
-        "Authorization": f"Bearer {GROQ_API_KEY}",
-        "Content-Type": "application/json"
-    }
-
+def _groq_request(full_prompt: str, system_prompt: Optional[str] = None, stream: bool = False) -> tuple:
+    """Build (url, headers, payload) for a Groq chat completion."""
     payload = {
         "model": GROQ_MODEL,
-        "messages": [
-            {"role": "user", "content": full_prompt}
-        ],
+        "messages": _chat_messages(full_prompt, system_prompt),
         "temperature": 0.7,
-        "max_tokens": 4096
+        "max_tokens": 4096,
+        "stream": stream
     }
 
-    with httpx.Client(timeout=60.0) as client:
-        response = client.post(GROQ_URL, headers=headers, json=payload)
-        response.raise_for_status()
-        result = response.json()
-        return result["choices"][0]["message"]["content"]
+    return GROQ_URL, GROQ_HEADERS, payload
 
 
-def call_huggingface(full_prompt: str) -> str:
+def _huggingface_request(full_prompt: str, system_prompt: Optional[str] = None, stream: bool = False) -> tuple:
+    """Build (url, headers, payload) for a HuggingFace chat completion."""
+    payload = {
+        "model": HUGGINGFACE_MODEL,
+        "messages": _chat_messages(full_prompt, system_prompt),
+        "max_tokens": 4096,
+        "stream": stream
+    }
+
+    return HUGGINGFACE_CHAT_URL, HUGGINGFACE_HEADERS, payload
+
+
+async def _post_with_key_pool(key_pool: ApiKeyPool, build_request, full_prompt: str,
+                              system_prompt: Optional[str] = None) -> dict:
+    """POST using the next key from the pool; park the key if it gets rate limited."""
+    api_key = key_pool.next_key()
+    url, headers, payload = build_request(full_prompt, system_prompt, api_key=api_key)
+    try:
+        response = await post_with_retry(url, headers=headers, content=orjson.dumps(payload))
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code == 429:
+            key_pool.mark_rate_limited(api_key, _retry_after_seconds(e.response))
+        raise
+    return orjson.loads(response.content)
+
+
+async def _stream_json_with_key_pool(key_pool: ApiKeyPool, build_request, extract_delta,
+                                    full_prompt: str, system_prompt: Optional[str] = None) -> str:
+    """Streaming twin of _post_with_key_pool: read until the JSON object closes."""
+    api_key = key_pool.next_key()
+    url, headers, payload = build_request(full_prompt, system_prompt, stream=True, api_key=api_key)
+    try:
+        return await _collect_json_stream(url, headers, payload, extract_delta)
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code == 429:
+            key_pool.mark_rate_limited(api_key, _retry_after_seconds(e.response))
+        raise
+
+
+async def call_openrouter(full_prompt: str, system_prompt: Optional[str] = None,
+                          stop_at_json: bool = False) -> str:
+    """
+    Call OpenRouter API (round-robins OPENROUTER_API_KEYS).
+    With stop_at_json, streams and stops once the JSON object is complete.
+    """
+    if stop_at_json:
+        return await _stream_json_with_key_pool(
+            OPENROUTER_KEYS, _openrouter_request, _openai_delta, full_prompt, system_prompt
+        )
+    result = await _post_with_key_pool(OPENROUTER_KEYS, _openrouter_request, full_prompt, system_prompt)
+    return result["choices"][0]["message"]["content"]
+
+
+async def call_gemini(full_prompt: str, system_prompt: Optional[str] = None,
+                      stop_at_json: bool = False) -> str:
+    """
+    Call Google Gemini API (round-robins GEMINI_API_KEYS).
+    With stop_at_json, streams (streamGenerateContent) and stops once the JSON object is complete.
+    """
+    if stop_at_json:
+        return await _stream_json_with_key_pool(
+            GEMINI_KEYS, _gemini_request, _gemini_delta, full_prompt, system_prompt
+        )
+    result = await _post_with_key_pool(GEMINI_KEYS, _gemini_request, full_prompt, system_prompt)
+    return result["candidates"][0]["content"]["parts"][0]["text"]
+
+
+async def call_groq(full_prompt: str, system_prompt: Optional[str] = None,
+                    stop_at_json: bool = False) -> str:
+    """
+    Call Groq API (free tier: 30 RPM, 14,400 requests/day).
+    Uses OpenAI-compatible chat completions endpoint.
+    With stop_at_json, streams and stops once the JSON object is complete.
+    """
+    if stop_at_json:
+        url, headers, payload = _groq_request(full_prompt, system_prompt, stream=True)
+        return await _collect_json_stream(url, headers, payload, _openai_delta)
+
+    url, headers, payload = _groq_request(full_prompt, system_prompt)
+    response = await post_with_retry(url, headers=headers, content=orjson.dumps(payload))
+    result = orjson.loads(response.content)
+    return result["choices"][0]["message"]["content"]
+
+
+async def call_huggingface(full_prompt: str, system_prompt: Optional[str] = None,
+                           stop_at_json: bool = False) -> str:
     """
     Call HuggingFace Inference API (free tier).
     Uses the serverless inference endpoint.
+    With stop_at_json, streams and stops once the JSON object is complete.
     """
-    url = f"{HUGGINGFACE_URL}/{HUGGINGFACE_MODEL}/v1/chat/completions"
+    if stop_at_json:
+        url, headers, payload = _huggingface_request(full_prompt, system_prompt, stream=True)
+        return await _collect_json_stream(url, headers, payload, _openai_delta,
+                                          timeout=HUGGINGFACE_TIMEOUT_SECONDS)
+
+    url, headers, payload = _huggingface_request(full_prompt, system_prompt)
+    response = await post_with_retry(url, headers=headers, content=orjson.dumps(payload),
+                                     timeout=HUGGINGFACE_TIMEOUT_SECONDS)
+    result = orjson.loads(response.content)
+    return result["choices"][0]["message"]["content"]
+
+
+# ─── Provider Cascade Order ──────────────────────────────────────────
+# API keys are fixed at startup, so the cascade is resolved once at import.
+_PROVIDER_TABLE = (
+    ("Groq", call_groq, "⚡", GROQ_API_KEY),
+    ("HuggingFace", call_huggingface, "🤗", HUGGINGFACE_API_KEY),
+    ("OpenRouter", call_openrouter, "🔄", OPENROUTER_API_KEY),
+    ("Gemini", call_gemini, "�", GEMINI_API_KEY),
+)
+LLM_PROVIDERS = tuple((name, call_fn, icon) for name, call_fn, icon, api_key in _PROVIDER_TABLE if api_key)
+UNCONFIGURED_PROVIDERS = tuple(name for name, _, _, api_key in _PROVIDER_TABLE if not api_key)
 
-    headers = {
-        "Authorization": f"Bearer {HUGGINGFACE_API_KEY}",
-        "Content-Type": "application/json"
-    }
 
-    payload = {
-        "model": HUGGINGFACE_MODEL,
-        "messages": [
-            {"role": "user", "content": full_prompt}
-        ],
-        "max_tokens": 4096,
-        "stream": False
-    }
+# ─── Streaming (SSE) ─────────────────────────────────────────────────
+
+def _openai_delta(chunk: dict) -> str:
+    """Text delta from an OpenAI-compatible streaming chunk."""
+    choices = chunk.get("choices") or [{}]
+    return choices[0].get("delta", {}).get("content") or ""
+
+
+def _gemini_delta(chunk: dict) -> str:
+    """Text delta from a Gemini streamGenerateContent chunk."""
+    candidates = chunk.get("candidates") or [{}]
+    parts = candidates[0].get("content", {}).get("parts") or [{}]
+    return parts[0].get("text") or ""
+
+
+async def _stream_provider(url: str, headers: dict, payload: dict, extract_delta,
+                           timeout: Optional[float] = None):
+    """Yield text deltas from a provider's server-sent event stream."""
+    response = await open_stream_with_retry(url, headers, payload, timeout=timeout)
+    try:
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == "[DONE]":
+                break
+            if not data:
+                continue
+            delta = extract_delta(orjson.loads(data))
+            if delta:
+                yield delta
+    finally:
+        await response.aclose()
+
+
+async def _collect_json_stream(url: str, headers: dict, payload: dict, extract_delta,
+                               timeout: Optional[float] = None) -> str:
+    """
+    Stream a completion but hang up as soon as the first JSON object closes,
+    so trailing prose/fences after the JSON are never generated or billed.
+    """
+    scanner = _JsonStreamScanner()
+    parts = []
+    stream = _stream_provider(url, headers, payload, extract_delta, timeout=timeout)
+    try:
+        async for delta in stream:
+            parts.append(delta)
+            if scanner.feed(delta):
+                break
+    finally:
+        await stream.aclose()
+    return "".join(parts)
+
+
+# Same order as LLM_PROVIDERS, with each provider's streaming request builder and timeout
+STREAM_PROVIDERS = tuple(
+    (name, build_request, extract_delta, timeout)
+    for name, build_request, extract_delta, timeout, api_key in (
+        ("Groq", _groq_request, _openai_delta, None, GROQ_API_KEY),
+        ("HuggingFace", _huggingface_request, _openai_delta, HUGGINGFACE_TIMEOUT_SECONDS, HUGGINGFACE_API_KEY),
+        ("OpenRouter", _openrouter_request, _openai_delta, None, OPENROUTER_API_KEY),
+        ("Gemini", _gemini_request, _gemini_delta, None, GEMINI_API_KEY),
+    )
+    if api_key
+)
+
+
+async def stream_llm(full_prompt: str, system_prompt: Optional[str] = None):
+    """
+    Stream LLM text deltas, using the same provider order as call_llm.
+    Falls back to the next provider only if one fails before its first token.
+    """
+    if not STREAM_PROVIDERS:
+        raise HTTPException(status_code=500, detail="No AI provider API keys configured.")
+
+    errors = {}
+    for name, build_request, extract_delta, timeout in STREAM_PROVIDERS:
+        # Same gating as call_llm's launch_next
+        breaker = PROVIDER_BREAKERS[name]
+        if not breaker.allow():
+            errors[name] = "skipped (circuit open after 429)" if breaker.rate_limited else "skipped (circuit open)"
+            continue
+        bucket = PROVIDER_BUCKETS.get(name)
+        if bucket and not bucket.try_acquire():
+            errors[name] = "skipped (local rate cap reached)"
+            continue
+
+        key_pool = PROVIDER_KEY_POOLS.get(name)
+        api_key = key_pool.next_key() if key_pool is not None else None
+        started = False
+        try:
+            logger.info("📡 Streaming from %s", name)
+            if key_pool is not None:
+                url, headers, payload = build_request(full_prompt, system_prompt, stream=True, api_key=api_key)
+            else:
+                url, headers, payload = build_request(full_prompt, system_prompt, stream=True)
+            async for delta in _stream_provider(url, headers, payload, extract_delta, timeout=timeout):
+                started = True
+                yield delta
+        except Exception as e:
+            if isinstance(e, httpx.HTTPStatusError) and e.response.status_code == 429 and key_pool is not None:
+                key_pool.mark_rate_limited(api_key, _retry_after_seconds(e.response))
+            _record_provider_failure(name, e)
+            if started:
+                raise
+            errors[name] = str(e)
+            logger.warning("⚠️ %s stream failed before first token: %s, trying next provider...", name, e)
+        else:
+            breaker.record_success()
+            return
+
+    error_summary = ", ".join(f"{k}: {v}" for k, v in errors.items())
+    raise HTTPException(status_code=500, detail=f"All AI providers failed. {error_summary}")
 
-    with httpx.Client(timeout=90.0) as client:
-        response = client.post(url, headers=headers, json=payload)
-        response.raise_for_status()
-        result = response.json()
-        return result["choices"][0]["message"]["content"]
+
+def _sse(event: str, data) -> str:
+    """Format one server-sent event frame."""
+    return f"event: {event}\ndata: {orjson.dumps(data).decode()}\n\n"
 
 
 # ============================================================
 # Auto-Retry Generation (NEW)
 # ============================================================
 
-def generate_with_retry(user_request: str) -> dict:
+# Prefix for a retry that came back byte-identical to the previous invalid output
+REPEATED_OUTPUT_ERROR = "Your corrected output was IDENTICAL to the invalid one — you must actually change it. "
+
+
+def _consume_task_outcome(task: asyncio.Task):
+    """Done-callback for background tasks that may be discarded: mark their
+    exception as retrieved so asyncio doesn't log 'Task exception was never retrieved'."""
+    if not task.cancelled():
+        task.exception()
+
+
+async def generate_with_retry(user_request: str) -> dict:
     """
     Generate automation JSON with self-healing retry loop.
     
@@ -358,196 +1083,242 @@ def generate_with_retry(user_request: str) -> dict:
     3. Parse JSON response
     4. Validate against schema + registry
     5. If invalid → build retry prompt with error context → re-call LLM
-    6. Max 3 attempts with exponential backoff
+    6. Max 3 attempts with jittered backoff
     
     Returns: { success, automation, attempts, errors }
     """
     # ─── Dynamic Pre-Step: Intent Analysis ───────────────────────────────
     dynamic_steps = []
-    if DYNAMIC_FEATURES_ENABLED:
-        try:
-            logger.info("🧠 Dynamic features enabled — analyzing intent for capability gaps")
-            tool_list = get_tool_prompt_text()
-            analysis_prompt = INTENT_ANALYSIS_PROMPT.format(
-                available_tools=tool_list,
-                user_request=user_request
-            )
-            analysis_response = call_llm(analysis_prompt)
-            analysis = extract_json_from_response(analysis_response)
-
-            if not analysis.get("can_fulfill_with_existing", True):
-                gaps = analysis.get("gaps", [])
-                if gaps:
-                    logger.info(f"🔍 Found {len(gaps)} capability gap(s), generating dynamic code")
-                    dynamic_steps = resolve_capability_gaps(
-                        gaps, call_llm, CODE_GENERATION_PROMPT, original_request=user_request
-                    )
-                    logger.info(f"✅ Generated {len(dynamic_steps)} dynamic step(s)")
-            else:
-                logger.info("✅ All capabilities covered by existing tools — proceeding normally")
-        except Exception as e:
-            logger.warning(f"⚠️ Intent analysis failed, proceeding with standard flow: {e}")
-            dynamic_steps = []
+    speculative_task = None
+    try:
+        if DYNAMIC_FEATURES_ENABLED:
+            # Most requests have no capability gaps, so start the standard generation
+            # call alongside the intent analysis instead of waiting for it.
+            speculative_task = asyncio.create_task(call_llm(
+                GENERATION_REQUEST_TEMPLATE.format(user_request=user_request),
+                system_prompt=build_generation_system_prompt(),
+                stop_at_json=True
+            ))
+            speculative_task.add_done_callback(_consume_task_outcome)
+            try:
+                logger.info("🧠 Dynamic features enabled — analyzing intent for capability gaps")
+                tool_list = get_tool_prompt_text()
+                analysis_prompt = INTENT_ANALYSIS_PROMPT.format(
+                    available_tools=tool_list,
+                    user_request=user_request
+                )
+                analysis_response = await call_llm(analysis_prompt)
+                analysis = extract_json_from_response(analysis_response)
+
+                if not analysis.get("can_fulfill_with_existing", True):
+                    gaps = analysis.get("gaps", [])
+                    if gaps:
+                        logger.info("🔍 Found %s capability gap(s), generating dynamic code", len(gaps))
+                        dynamic_steps = await resolve_capability_gaps(
+                            gaps, call_llm, CODE_GENERATION_PROMPT, original_request=user_request
+                        )
+                        logger.info("✅ Generated %s dynamic step(s)", len(dynamic_steps))
+                else:
+                    logger.info("✅ All capabilities covered by existing tools — proceeding normally")
+            except Exception as e:
+                logger.warning("⚠️ Intent analysis failed, proceeding with standard flow: %s", e)
+                dynamic_steps = []
 
-    attempts = []
-    max_attempts = RETRY_CONFIG["max_attempts"]
+            if dynamic_steps:
+                # The speculative output would include data-fetching steps — discard it
+                speculative_task.cancel()
+                speculative_task = None
+
+        attempts = []
+        max_attempts = RETRY_CONFIG["max_attempts"]
+        delay = RETRY_CONFIG["base_delay_seconds"]
+        prev_raw_output = None  # untruncated; attempt_details only keeps the first 500 chars
     
-    for attempt in range(1, max_attempts + 1):
-        attempt_start = time.time()
-        error_msg = None
-        raw_output = None
+        for attempt in range(1, max_attempts + 1):
+            attempt_start = time.time()
+            error_msg = None
+            raw_output = None
         
-        try:
-            if attempt == 1:
-                # First attempt: use full generation prompt
-                if dynamic_steps:
-                    # Dynamic steps exist — tell the LLM that data-fetching is handled
-                    dynamic_descriptions = "\n".join(
-                        f"  - Step type 'dynamic' (capability: {ds['capability']}): {ds['description']}"
-                        for ds in dynamic_steps
-                    )
-                    dynamic_addendum = (
-                        f"\n\n══════════════════════════════════════════════════\n"
-                        f"  PRE-HANDLED DYNAMIC STEPS\n"
-                        f"══════════════════════════════════════════════════\n"
-                        f"The following capabilities are ALREADY handled by dynamic code generation.\n"
-                        f"Do NOT add any data-fetching step for these — they will be auto-injected:\n"
-                        f"{dynamic_descriptions}\n\n"
-                        f"Your job: ONLY generate the notification/output steps (send_email, notify, "
-                        f"append_google_sheet, etc.) that consume the data produced by the dynamic steps.\n"
-                        f"The dynamic step output includes a 'summary' key with human-readable formatted text.\n"
-                        f"For email body or notification message, use {{{{step_1.summary}}}} to get the formatted text.\n"
-                        f"Do NOT include scrape_*, fetch_*, http_request, or any data-fetching tool.\n"
-                    )
-                    full_prompt = build_generation_prompt(user_request) + dynamic_addendum
-                    logger.info("📝 Using dynamic-aware generation prompt")
+            try:
+                if attempt == 1:
+                    # First attempt: use full generation prompt
+                    if dynamic_steps:
+                        # Dynamic steps exist — tell the LLM that data-fetching is handled
+                        dynamic_descriptions = "\n".join(
+                            f"  - Step type 'dynamic' (capability: {ds['capability']}): {ds['description']}"
+                            for ds in dynamic_steps
+                        )
+                        dynamic_addendum = (
+                            f"\n\n══════════════════════════════════════════════════\n"
+                            f"  PRE-HANDLED DYNAMIC STEPS\n"
+                            f"══════════════════════════════════════════════════\n"
+                            f"The following capabilities are ALREADY handled by dynamic code generation.\n"
+                            f"Do NOT add any data-fetching step for these — they will be auto-injected:\n"
+                            f"{dynamic_descriptions}\n\n"
+                            f"Your job: ONLY generate the notification/output steps (send_email, notify, "
+                            f"append_google_sheet, etc.) that consume the data produced by the dynamic steps.\n"
+                            f"The dynamic step output includes a 'summary' key with human-readable formatted text.\n"
+                            f"For email body or notification message, use {{{{step_1.summary}}}} to get the formatted text.\n"
+                            f"Do NOT include scrape_*, fetch_*, http_request, or any data-fetching tool.\n"
+                        )
+                        system_prompt = build_generation_system_prompt() + dynamic_addendum
+                        logger.info("📝 Using dynamic-aware generation prompt")
+                    else:
+                        system_prompt = build_generation_system_prompt()
+                    full_prompt = GENERATION_REQUEST_TEMPLATE.format(user_request=user_request)
                 else:
-                    full_prompt = build_generation_prompt(user_request)
-            else:
-                # Retry: use correction prompt with error context
-                prev_error = attempts[-1]["error"]
-                prev_output = attempts[-1]["raw_output"] or "No output"
+                    # Retry: use correction prompt with error context
+                    prev_error = attempts[-1]["error"]
+                    prev_output = prev_raw_output or "No output"
                 
-                full_prompt = RETRY_CORRECTION_PROMPT.format(
-                    error=prev_error,
-                    invalid_output=prev_output[:2000],  # Truncate to avoid token limits
-                    user_request=user_request,
-                    allowed_steps=", ".join(get_allowed_tool_names())
-                )
+                    system_prompt = build_retry_system_prompt()
+                    full_prompt = RETRY_CORRECTION_REQUEST_TEMPLATE.format(
+                        error=truncate_to_tokens(prev_error, RETRY_CONFIG["prev_error_tokens"]),
+                        invalid_output=truncate_to_tokens(prev_output, RETRY_CONFIG["prev_output_tokens"]),
+                        user_request=user_request
+                    )
             
-            # Call LLM — HTTPException means provider is down, don't retry
-            response_text = call_llm(full_prompt)
-            raw_output = response_text
+                # Call LLM — HTTPException means provider is down, don't retry
+                if attempt == 1 and speculative_task is not None:
+                    logger.info("⚡ Using speculative generation started during intent analysis")
+                    response_text = await speculative_task
+                else:
+                    response_text = await call_llm(full_prompt, system_prompt=system_prompt, stop_at_json=True)
+                raw_output = response_text
             
-            # Parse JSON
-            automation = extract_json_from_response(response_text)
+                # Identical output fails identically — skip re-parsing and push harder on the next retry
+                if attempts and response_text == prev_raw_output:
+                    raise ValueError(REPEATED_OUTPUT_ERROR + attempts[-1]["error"].removeprefix(REPEATED_OUTPUT_ERROR))
             
-            # Check for error response from LLM
-            if "error" in automation:
-                error_msg = f"LLM returned error: {automation['error']}"
-                raise ValueError(error_msg)
+                # Parse JSON
+                automation = extract_json_from_response(response_text)
             
-            # Validate
-            is_valid, validation_error = validate_automation(automation)
+                # Check for error response from LLM
+                if "error" in automation:
+                    error_msg = f"LLM returned error: {automation['error']}"
+                    raise ValueError(error_msg)
             
-            if not is_valid:
-                error_msg = f"Validation failed: {validation_error}"
-                raise ValueError(error_msg)
+                # Validate
+                is_valid, validation_error = validate_automation(automation)
             
-            # Sanitize
-            automation = sanitize_automation(automation)
+                if not is_valid:
+                    error_msg = f"Validation failed: {validation_error}"
+                    raise ValueError(error_msg)
             
-            # Inject dynamic steps if any were generated
-            if dynamic_steps:
-                existing_steps = automation.get("steps", [])
+                # Sanitize
+                automation = sanitize_automation(automation)
+            
+                # Inject dynamic steps if any were generated
+                if dynamic_steps:
+                    existing_steps = automation.get("steps", [])
                 
-                # Strip data-fetching steps that the LLM may have added despite being 
-                # told not to — these duplicate the dynamic steps
-                data_fetch_prefixes = ("scrape_", "fetch_", "http_request")
-                original_count = len(existing_steps)
-                existing_steps = [
-                    step for step in existing_steps 
-                    if not step.get("type", "").startswith(data_fetch_prefixes)
-                ]
-                stripped = original_count - len(existing_steps)
-                if stripped:
-                    logger.info(f"🧹 Stripped {stripped} redundant data-fetching step(s) from LLM output")
+                    # Strip data-fetching steps that the LLM may have added despite being 
+                    # told not to — these duplicate the dynamic steps
+                    data_fetch_prefixes = ("scrape_", "fetch_", "http_request")
+                    original_count = len(existing_steps)
+                    existing_steps = [
+                        step for step in existing_steps 
+                        if not step.get("type", "").startswith(data_fetch_prefixes)
+                    ]
+                    stripped = original_count - len(existing_steps)
+                    if stripped:
+                        logger.info("🧹 Stripped %s redundant data-fetching step(s) from LLM output", stripped)
                 
-                # Insert dynamic steps at the beginning (position 0)
-                # so they become step_1, step_2, etc. and notification steps can reference them
-                for i, ds in enumerate(dynamic_steps):
-                    existing_steps.insert(i, ds)
+                    # Insert dynamic steps at the beginning (position 0)
+                    # so they become step_1, step_2, etc. and notification steps can reference them
+                    for i, ds in enumerate(dynamic_steps):
+                        existing_steps.insert(i, ds)
                 
-                automation["steps"] = existing_steps
-                logger.info(f"📦 Injected {len(dynamic_steps)} dynamic step(s) into workflow")
+                    automation["steps"] = existing_steps
+                    logger.info("📦 Injected %s dynamic step(s) into workflow", len(dynamic_steps))
+            
+                # Success!
+                duration = time.time() - attempt_start
+                attempts.append({
+                    "attempt": attempt,
+                    "status": "success",
+                    "duration_seconds": round(duration, 2),
+                    "error": None,
+                    "raw_output": None
+                })
+            
+                logger.info("✅ Generation succeeded on attempt %s/%s (%.2fs)", attempt, max_attempts, duration)
             
-            # Success!
+                return {
+                    "success": True,
+                    "automation": automation,
+                    "attempts": len(attempts),
+                    "attempt_details": attempts,
+                    "dynamic_steps_count": len(dynamic_steps)
+                }
+            
+            except HTTPException:
+                # LLM provider is down — don't retry, propagate immediately
+                raise
+            except ValueError as e:
+                error_msg = str(e)
+            except Exception as e:
+                error_msg = f"Unexpected error: {str(e)}"
+        
+            # Record failed attempt
             duration = time.time() - attempt_start
             attempts.append({
                 "attempt": attempt,
-                "status": "success",
+                "status": "failed",
                 "duration_seconds": round(duration, 2),
-                "error": None,
-                "raw_output": None
-            })
-            
-            logger.info(f"✅ Generation succeeded on attempt {attempt}/{max_attempts}", extra={
-                "attempt": attempt,
-                "duration": round(duration, 2)
+                "error": error_msg,
+                "raw_output": raw_output[:500] if raw_output else None
             })
-            
-            return {
-                "success": True,
-                "automation": automation,
-                "attempts": len(attempts),
-                "attempt_details": attempts,
-                "dynamic_steps_count": len(dynamic_steps)
-            }
-            
-        except HTTPException:
-            # LLM provider is down — don't retry, propagate immediately
-            raise
-        except ValueError as e:
-            error_msg = str(e)
-        except Exception as e:
-            error_msg = f"Unexpected error: {str(e)}"
-        
-        # Record failed attempt
-        duration = time.time() - attempt_start
-        attempts.append({
-            "attempt": attempt,
-            "status": "failed",
-            "duration_seconds": round(duration, 2),
-            "error": error_msg,
-            "raw_output": raw_output[:500] if raw_output else None
-        })
+            prev_raw_output = raw_output
         
-        logger.warning(f"⚠️ Generation attempt {attempt}/{max_attempts} failed: {error_msg}")
+            logger.warning("⚠️ Generation attempt %s/%s failed: %s", attempt, max_attempts, error_msg)
         
-        # Exponential backoff before retry
-        if attempt < max_attempts:
-            delay = min(
-                RETRY_CONFIG["base_delay_seconds"] * (2 ** (attempt - 1)),
-                RETRY_CONFIG["max_delay_seconds"]
-            )
-            logger.info(f"⏳ Waiting {delay}s before retry...")
-            time.sleep(delay)
+            # Decorrelated-jitter backoff before retry, so concurrent retries don't stampede
+            if attempt < max_attempts:
+                delay = random.uniform(
+                    RETRY_CONFIG["base_delay_seconds"],
+                    min(RETRY_CONFIG["max_delay_seconds"], delay * 3)
+                )
+                logger.info("⏳ Waiting %.1fs before retry...", delay)
+                await asyncio.sleep(delay)
     
-    # All attempts failed
-    logger.error(f"❌ Generation failed after {max_attempts} attempts")
+        # All attempts failed
+        logger.error("❌ Generation failed after %s attempts", max_attempts)
     
-    return {
-        "success": False,
-        "automation": None,
-        "attempts": len(attempts),
-        "attempt_details": attempts,
-        "final_error": attempts[-1]["error"] if attempts else "Unknown error"
-    }
+        return {
+            "success": False,
+            "automation": None,
+            "attempts": len(attempts),
+            "attempt_details": attempts,
+            "final_error": attempts[-1]["error"] if attempts else "Unknown error"
+        }
+    finally:
+        # Never leave the speculative call running once we are done with it (or abandoned)
+        if speculative_task is not None and not speculative_task.done():
+            speculative_task.cancel()
 
 
 def build_automation_from_context(context: dict) -> dict:
+    """Build automation JSON from collected context (memoized per identical context)."""
+    automation = get_cached_automation(context)
+    if automation is None:
+        automation = _build_automation_from_context(context)
+        set_cached_automation(context, automation)
+    return automation
+
+
+# Intent -> primary data step; intents without an entry get only the notification step
+_INTENT_STEP_BUILDERS = {
+    "stock_monitor": lambda ctx: {"type": "fetch_stock_price", "symbol": (ctx.get("symbol") or "UNKNOWN").upper()},
+    "crypto_monitor": lambda ctx: {"type": "fetch_crypto_price", "symbol": (ctx.get("symbol") or "BTC").upper()},
+    "job_alert": lambda ctx: {"type": "job_search", "query": ctx.get("query", "developer")},
+}
+
+
+def _build_automation_from_context(context: dict) -> dict:
     """Build automation JSON from collected context."""
     intent = context.get("intent", "custom")
+    symbol = (context.get("symbol") or "").upper()
     
     # Build trigger
     interval = context.get("interval", "5m")
@@ -556,15 +1327,9 @@ def build_automation_from_context(context: dict) -> dict:
     # Build steps based on intent
     steps = []
     
-    if intent == "stock_monitor":
-        symbol = context.get("symbol", "UNKNOWN")
-        steps.append({"type": "fetch_stock_price", "symbol": symbol.upper()})
-    elif intent == "crypto_monitor":
-        symbol = context.get("symbol", "BTC")
-        steps.append({"type": "fetch_crypto_price", "symbol": symbol.upper()})
-    elif intent == "job_alert":
-        query = context.get("query", "developer")
-        steps.append({"type": "job_search", "query": query})
+    builder = _INTENT_STEP_BUILDERS.get(intent)
+    if builder:
+        steps.append(builder(context))
     
     # Add notification step
     channel = context.get("notification_channel", "send_notification")
@@ -573,14 +1338,13 @@ def build_automation_from_context(context: dict) -> dict:
     else:
         notification_type = normalize_channel_response(channel)
     
-    symbol = context.get("symbol", "")
     steps.append({
         "type": notification_type,
-        "message": f"{symbol.upper()} update" if symbol else "Automation update"
+        "message": f"{symbol} update" if symbol else "Automation update"
     })
     
     # Build name
-    name = f"{context.get('symbol', 'Automation').upper()} {intent.replace('_', ' ').title()}"
+    name = f"{symbol or 'AUTOMATION'} {intent.replace('_', ' ').title()}"
     
     return {
         "name": name,
@@ -595,9 +1359,8 @@ def build_automation_from_context(context: dict) -> dict:
 # Health Check
 # ============================================================
 
-@app.get("/health")
-async def health_check():
-    """Service health check endpoint"""
+def _build_health_static() -> dict:
+    """Parts of the /health body that are fixed once the process has started."""
     configured_providers = []
     if GEMINI_API_KEY: configured_providers.append("gemini")
     if OPENROUTER_API_KEY: configured_providers.append("openrouter")
@@ -610,35 +1373,70 @@ async def health_check():
 
     return {
         "status": "python service ready",
-        "timestamp": datetime.now().isoformat(),
         "version": "2.2.0",
         "llm_providers": configured_providers,
         "llm_provider_count": len(configured_providers),
         "llm_configured": len(configured_providers) > 0,
         "primary_model": GEMINI_MODEL if GEMINI_API_KEY else (GROQ_MODEL if GROQ_API_KEY else LLM_MODEL),
-        "allowed_steps": get_allowed_tool_names(),
         "features": features,
         "dynamic_code_generation": DYNAMIC_FEATURES_ENABLED
     }
 
 
+_HEALTH_STATIC = _build_health_static()
+
+
+@app.get("/health")
+async def health_check():
+    """Service health check endpoint"""
+    # Only the timestamp, registry tool list and cache counters change at runtime
+    return {
+        **_HEALTH_STATIC,
+        "timestamp": _health_timestamp,
+        "allowed_steps": get_allowed_tool_names(),
+        "cache": cache_stats()
+    }
+
+
 # ============================================================
 # Intent Parsing
 # ============================================================
 
+async def extract_intent_and_entities(text: str) -> dict:
+    """
+    Extract intent + entities with one LLM call (UNIFIED_EXTRACTION_PROMPT).
+    Shared by /parse-intent and the first /conversation turn, so a chain
+    that hits both only pays for one call.
+    """
+    extracted = get_cached("unified_extraction", text)
+    if extracted is None and FAST_PATH_ENABLED:
+        extracted = try_fast_extract(text)
+        if extracted is not None:
+            logger.info("⚡ Fast path: extracted %s locally", extracted["intent"])
+    if extracted is None:
+        response_text = await call_llm(
+            f"User request: {text}", system_prompt=UNIFIED_EXTRACTION_PROMPT
+        )
+        extracted = extract_json_from_response(response_text)
+        set_cached("unified_extraction", text, extracted)
+    return extracted
+
+
 @app.post("/parse-intent")
 async def parse_intent(request: TextRequest):
     """Parse user text into structured intent."""
+    check_text_size(request.text)
     try:
-        full_prompt = f"{PARSE_INTENT_PROMPT}\n\nUser request: {request.text}"
-        response_text = call_llm(full_prompt)
-        result = extract_json_from_response(response_text)
+        result = await extract_intent_and_entities(request.text)
+        intent = result.get("intent", "custom")
+        entities = result.get("entities") or {}
         
         return {
             "success": True,
-            "intent": result.get("intent", "custom"),
-            "entities": result.get("entities", {}),
-            "channel": result.get("channel", "notification"),
+            "intent": intent,
+            "entities": entities,
+            "channel": entities.get("notification_channel", "notification"),
+            "missing_fields": ClarificationHandler.detect_missing_fields(intent, entities),
             "raw_text": request.text
         }
         
@@ -658,6 +1456,7 @@ async def conversation(request: ConversationRequest):
     Handle multi-turn conversation for automation creation.
     Uses auto-retry when generating final automation.
     """
+    check_text_size(request.text)
     input_mode = request.input_mode
     context = request.context or {}
     previous_answers = context.get("previous_answers", {})
@@ -667,24 +1466,45 @@ async def conversation(request: ConversationRequest):
         if context.get("awaiting_field"):
             # User is answering a previous question
             awaiting_field = context["awaiting_field"]
+            awaiting_fields = context.get("awaiting_fields") or [awaiting_field]
             partial_context = context.get("partial_context", {})
             
-            # Merge the new answer
-            updated_context = ClarificationHandler.merge_context(
-                partial_context, 
-                awaiting_field, 
-                request.text
-            )
+            if len(awaiting_fields) > 1:
+                # Compound question — extract every answer with a single LLM call
+                answers_prompt = CLARIFICATION_ANSWERS_PROMPT.format(
+                    intent=partial_context.get("intent", "custom"),
+                    fields=", ".join(awaiting_fields)
+                )
+                response_text = await call_llm(
+                    f"User answer: {request.text}", system_prompt=answers_prompt
+                )
+                answers = extract_json_from_response(response_text)
+                if not isinstance(answers, dict):
+                    # Unusable reply — merge nothing so the question below is asked again
+                    logger.warning("⚠️ Clarification answers were not a JSON object, re-asking")
+                    answers = {}
+                updated_context = ClarificationHandler.merge_many(
+                    partial_context,
+                    {field: answers.get(field) for field in awaiting_fields}
+                )
+            else:
+                # Merge the new answer
+                updated_context = ClarificationHandler.merge_context(
+                    partial_context, 
+                    awaiting_field, 
+                    request.text
+                )
             
             # Check if more fields are missing
             intent = updated_context.get("intent", "stock_monitor")
             
             if ClarificationHandler.needs_clarification(intent, updated_context):
-                # Need more info - ask next question
-                clarification = ClarificationHandler.get_next_question(
+                # Need more info - ask for everything still missing at once
+                clarification = ClarificationHandler.get_compound_question(
                     intent, updated_context, input_mode
                 )
                 clarification["awaiting_field"] = clarification["missing_field"]
+                clarification["awaiting_fields"] = clarification["missing_fields"]
                 return clarification
             else:
                 # All fields collected - generate automation
@@ -703,20 +1523,19 @@ async def conversation(request: ConversationRequest):
                 }
         
         # First turn - parse intent and extract entities
-        full_prompt = f"{ENTITY_EXTRACTION_PROMPT}\n\nUser request: {request.text}"
-        response_text = call_llm(full_prompt)
-        extracted = extract_json_from_response(response_text)
+        extracted = await extract_intent_and_entities(request.text)
         
         intent = extracted.get("intent", "stock_monitor")
-        entities = extracted.get("entities", {})
+        entities = extracted.get("entities") or {}
         
         # Check for missing required fields
         if ClarificationHandler.needs_clarification(intent, entities):
-            # Generate clarification question
-            clarification = ClarificationHandler.get_next_question(
+            # Ask for all missing fields in one question
+            clarification = ClarificationHandler.get_compound_question(
                 intent, entities, input_mode
             )
             clarification["awaiting_field"] = clarification["missing_field"]
+            clarification["awaiting_fields"] = clarification["missing_fields"]
             return clarification
         else:
             # All info present - generate automation directly
@@ -754,14 +1573,73 @@ async def generate_automation(request: TextRequest):
     """
     Generate complete automation JSON from user text.
     Now with auto-retry: if generation fails, retries with error context.
+    Successful generations are cached per normalized request text.
+    """
+    check_text_size(request.text)
+    return await _generate_automation_response(request.text)
+
+
+@app.post("/generate-automation/stream")
+async def generate_automation_stream(request: TextRequest):
+    """
+    Same as /generate-automation, delivered as server-sent events.
+    Heartbeat frames are sent while generation runs, then a single 'result' event.
     """
-    result = generate_with_retry(request.text)
+    check_text_size(request.text)
+    async def events():
+        task = asyncio.create_task(_generate_automation_response(request.text))
+        try:
+            while True:
+                done, _ = await asyncio.wait({task}, timeout=SSE_HEARTBEAT_SECONDS)
+                if done:
+                    break
+                yield _sse("heartbeat", {"status": "generating"})
+            yield _sse("result", task.result())
+        except HTTPException as e:
+            yield _sse("error", {"success": False, "error": e.detail})
+        except Exception as e:
+            logger.error("❌ Streaming automation generation failed: %s", e)
+            yield _sse("error", {"success": False, "error": str(e)})
+        finally:
+            task.cancel()
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+async def _generate_automation_response(text: str) -> dict:
+    """Build the /generate-automation response body (cache → fast path → retry loop)."""
+    cached_automation = get_cached("generate_automation", text)
+    if cached_automation is not None:
+        return {
+            "success": True,
+            "automation": cached_automation,
+            "raw_text": text,
+            "attempts": 0,
+            "retried": False,
+            "cached": True
+        }
+
+    # Simple price monitors are built locally — no LLM round trip
+    fast_automation = try_fast_path(text) if FAST_PATH_ENABLED else None
+    if fast_automation is not None and validate_automation(fast_automation)[0]:
+        logger.info("⚡ Fast path built automation: %s", fast_automation['name'])
+        return {
+            "success": True,
+            "automation": sanitize_automation(fast_automation),
+            "raw_text": text,
+            "attempts": 0,
+            "retried": False,
+            "fast_path": True
+        }
+
+    result = await generate_with_retry(text)
     
     if result["success"]:
+        set_cached("generate_automation", text, result["automation"])
         return {
             "success": True,
             "automation": result["automation"],
-            "raw_text": request.text,
+            "raw_text": text,
             "attempts": result["attempts"],
             "retried": result["attempts"] > 1
         }
@@ -769,7 +1647,7 @@ async def generate_automation(request: TextRequest):
         return {
             "success": False,
             "error": result["final_error"],
-            "raw_text": request.text,
+            "raw_text": text,
             "attempts": result["attempts"],
             "attempt_details": result["attempt_details"]
         }
@@ -785,22 +1663,51 @@ async def generate_text(request: GenerateRequest):
     Generic text generation endpoint.
     Used for summarization, expanding content, etc.
     """
+    # Prefer the full detailed prompt if provided
+    full_prompt = request.user_request if request.user_request else request.prompt
+    check_text_size(full_prompt, MAX_PROMPT_CHARS)
+    
     try:
-        # Prefer the full detailed prompt if provided
-        full_prompt = request.user_request if request.user_request else request.prompt
-        
-        logger.info(f"📝 Generative request (len={len(full_prompt)})")
-        context_response = call_llm(full_prompt)
+        logger.info("📝 Generative request (len=%s)", len(full_prompt))
+        # Full prompts are keyed on their exact text — case and punctuation can change the answer
+        context_response = get_cached("generate", full_prompt, normalize=False)
+        if context_response is None:
+            context_response = await call_llm(full_prompt)
+            set_cached("generate", full_prompt, context_response, normalize=False)
         
         return {
             "success": True,
             "result": context_response
         }
     except Exception as e:
-        logger.error(f"❌ Generation failed: {str(e)}")
+        logger.error("❌ Generation failed: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/generate/stream")
+async def generate_text_stream(request: GenerateRequest):
+    """
+    Streaming variant of /generate.
+    Emits 'token' events as the provider produces text, then a final 'done' event.
+    """
+    full_prompt = request.user_request if request.user_request else request.prompt
+    check_text_size(full_prompt, MAX_PROMPT_CHARS)
+    logger.info("📝 Streaming generative request (len=%s)", len(full_prompt))
+
+    async def events():
+        try:
+            async for delta in stream_llm(full_prompt):
+                yield _sse("token", {"text": delta})
+            yield _sse("done", {"success": True})
+        except HTTPException as e:
+            yield _sse("error", {"success": False, "error": e.detail})
+        except Exception as e:
+            logger.error("❌ Streaming generation failed: %s", e)
+            yield _sse("error", {"success": False, "error": str(e)})
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
 # ============================================================
 # Registry Refresh
 # ============================================================
@@ -809,7 +1716,7 @@ async def generate_text(request: GenerateRequest):
 async def refresh_registry():
     """Force refresh of tool registry from Node.js backend."""
     try:
-        data = fetch_registry("http://localhost:3000")
+        data = await asyncio.to_thread(fetch_registry, BACKEND_URL)
         if data:
             return {"success": True, "message": "Registry refreshed", "tools": len(data.get("toolNames", []))}
         else:
@@ -825,12 +1732,16 @@ async def refresh_registry():
 @app.post("/research-twitter")
 async def research_twitter(request: TextRequest):
     """Research latest tweets/activity for a user via AI when scraping is blocked."""
+    check_text_size(request.text)
     try:
         username = request.text.replace('@', '').strip()
-        logger.info(f"🔍 Researching Twitter activity for @{username}")
+        logger.info("🔍 Researching Twitter activity for @%s", username)
         
-        full_prompt = TWITTER_RESEARCH_PROMPT.format(username=username)
-        response_text = call_llm(full_prompt)
+        response_text = get_cached("research_twitter", username)
+        if response_text is None:
+            full_prompt = TWITTER_RESEARCH_PROMPT.format(username=username)
+            response_text = await call_llm(full_prompt)
+            set_cached("research_twitter", username, response_text)
         
         return {
             "success": True,
@@ -838,7 +1749,7 @@ async def research_twitter(request: TextRequest):
             "data": response_text
         }
     except Exception as e:
-        logger.error(f"❌ Twitter research failed: {str(e)}")
+        logger.error("❌ Twitter research failed: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -901,8 +1812,10 @@ async def execute_dynamic(request: DynamicExecuteRequest):
     Validates output quality and conditionally saves to Firestore learned tools.
     """
     try:
-        logger.info(f"⚡ Executing dynamic code (len={len(request.generated_code)})")
-        result = execute_in_sandbox(
+        logger.info("⚡ Executing dynamic code (len=%s)", len(request.generated_code))
+        # Sandbox blocks (waiting on the sandbox process or Lambda) — keep it off the event loop
+        result = await asyncio.to_thread(
+            execute_in_sandbox,
             generated_code=request.generated_code,
             inputs=request.inputs,
             context=request.context
@@ -911,7 +1824,7 @@ async def execute_dynamic(request: DynamicExecuteRequest):
         # Validate output quality (Fix 3)
         is_valid, reason = _validate_dynamic_output(result)
         if not is_valid:
-            logger.warning(f"⚠️ Dynamic output validation failed: {reason}")
+            logger.warning("⚠️ Dynamic output validation failed: %s", reason)
             result["_validation_failed"] = True
             result["_validation_reason"] = reason
         else:
@@ -930,19 +1843,20 @@ async def execute_dynamic(request: DynamicExecuteRequest):
             description = request.context.get("description", "")
             if capability:
                 from dynamic_resolver import _save_learned_tool
-                _save_learned_tool(
+                await asyncio.to_thread(
+                    _save_learned_tool,
                     capability=capability,
                     description=description,
                     generated_code=request.generated_code,
                     inputs=request.inputs
                 )
-                logger.info(f"💾 Saved learned tool after successful execution: {capability}")
+                logger.info("💾 Saved learned tool after successful execution: %s", capability)
         elif request.context.get("save_as_learned_tool", False):
-            logger.warning(f"⚠️ Skipped saving learned tool — result did not pass quality checks")
+            logger.warning("⚠️ Skipped saving learned tool — result did not pass quality checks")
 
         return result
     except Exception as e:
-        logger.error(f"❌ Dynamic execution failed: {str(e)}")
+        logger.error("❌ Dynamic execution failed: %s", e)
         return {
             "success": False,
             "result": None,
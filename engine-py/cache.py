@@ -0,0 +1,144 @@
+"""
+Response Cache for LLM-backed Endpoints
+
+In-process TTL + LRU cache for parsed LLM results:
+- Keyed on (prompt tag, normalized user text) via BLAKE2b — exact match only;
+  full prompts opt out of normalization and are keyed on their exact bytes
+- Entries expire after RESPONSE_CACHE_TTL_SECONDS
+- Oldest entries are evicted beyond RESPONSE_CACHE_MAX_ENTRIES
+- Values are deep-copied in and out so callers can mutate freely
+- Deterministic automations built from conversation context are memoized too
+"""
+
+import copy
+import hashlib
+import logging
+import time
+import orjson
+from collections import OrderedDict
+from typing import Any, Optional
+
+from config import RESPONSE_CACHE_TTL_SECONDS, RESPONSE_CACHE_MAX_ENTRIES
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """Small LRU cache with per-entry expiry."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, or None if missing/expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any):
+        """Store a value, evicting the least recently used entry if full."""
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+# ─── Prompt-Tagged Response Cache ───────────────────────────────────────
+
+_response_cache = TTLCache(RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_TTL_SECONDS)
+
+
+# Wrapping quotes and trailing sentence punctuation carry no meaning in a request
+_QUOTE_CHARS = " \"'`“”‘’"
+_TRAILING_CHARS = _QUOTE_CHARS + ".!?"
+
+
+def normalize_text(text: str) -> str:
+    """
+    Collapse case, whitespace, wrapping quotes and trailing sentence punctuation
+    so trivially different phrasings of one request share a key.
+    """
+    return " ".join(text.lower().split()).strip(_QUOTE_CHARS).rstrip(_TRAILING_CHARS)
+
+
+def make_cache_key(prompt_tag: str, text: str, normalize: bool = True) -> str:
+    """
+    Build a stable cache key for a prompt tag + user text pair.
+    Pass normalize=False for anything other than short user-intent text
+    (e.g. a full prompt, where case and punctuation can matter).
+    """
+    if normalize:
+        text = normalize_text(text)
+    return hashlib.blake2b(f"{prompt_tag}|{text}".encode("utf-8"), digest_size=16).hexdigest()
+
+
+def get_cached(prompt_tag: str, text: str, normalize: bool = True) -> Optional[Any]:
+    """Look up a cached result for this prompt tag and user text."""
+    if RESPONSE_CACHE_TTL_SECONDS <= 0:
+        return None
+    value = _response_cache.get(make_cache_key(prompt_tag, text, normalize))
+    if value is None:
+        return None
+    logger.info(f"⚡ Cache hit for {prompt_tag}")
+    return copy.deepcopy(value)
+
+
+def set_cached(prompt_tag: str, text: str, value: Any, normalize: bool = True):
+    """Cache a result for this prompt tag and user text."""
+    if RESPONSE_CACHE_TTL_SECONDS <= 0:
+        return
+    _response_cache.set(make_cache_key(prompt_tag, text, normalize), copy.deepcopy(value))
+
+
+# ─── Context-Keyed Automation Cache ─────────────────────────────────────
+
+_automation_cache = TTLCache(RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_TTL_SECONDS)
+
+
+def make_context_key(context: dict) -> str:
+    """Hash the canonical (sorted-key) JSON form of a conversation context."""
+    return hashlib.blake2b(orjson.dumps(context, option=orjson.OPT_SORT_KEYS), digest_size=16).hexdigest()
+
+
+def get_cached_automation(context: dict) -> Optional[dict]:
+    """Look up an automation previously built from an identical context."""
+    value = _automation_cache.get(make_context_key(context))
+    return copy.deepcopy(value) if value is not None else None
+
+
+def set_cached_automation(context: dict, automation: dict):
+    """Cache an automation built from this context."""
+    _automation_cache.set(make_context_key(context), copy.deepcopy(automation))
+
+
+def cache_stats() -> dict:
+    """Size and hit/miss counters for both caches (reported by /health)."""
+    return {
+        "responses": _response_cache.stats(),
+        "automations": _automation_cache.stats()
+    }
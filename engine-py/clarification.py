@@ -5,6 +5,7 @@ Handles multi-turn conversation for incomplete automation requests.
 """
 
 import json
+from functools import lru_cache
 from typing import Optional, Tuple
 from required_fields import (
     get_required_fields, 
@@ -14,6 +15,27 @@ from required_fields import (
 )
 
 
+@lru_cache(maxsize=128)
+def _voice_question(question_text: str, options: Optional[tuple]) -> Tuple[str, str]:
+    """Render (spoken question, SSML) once per question/options pair."""
+    if options:
+        options_text = ", ".join(options[:-1]) + f", or {options[-1]}" if len(options) > 1 else options[0]
+        full_question = f"{question_text} You can say {options_text}."
+        ssml = f"<speak>{question_text} <break time='300ms'/> You can say {options_text}.</speak>"
+    else:
+        full_question = question_text
+        ssml = f"<speak>{question_text}</speak>"
+    return full_question, ssml
+
+
+# Notification step type -> how the confirmation describes it
+_CONFIRMATION_CHANNELS = {
+    "send_whatsapp": "message you on WhatsApp",
+    "send_email": "email you",
+    "send_notification": "send you a notification",
+}
+
+
 class ClarificationHandler:
     """Handles clarification detection and question generation."""
     
@@ -61,13 +83,7 @@ class ClarificationHandler:
         
         # Format for voice vs text
         if input_mode == "voice":
-            if options:
-                options_text = ", ".join(options[:-1]) + f", or {options[-1]}" if len(options) > 1 else options[0]
-                full_question = f"{question_text} You can say {options_text}."
-                ssml = f"<speak>{question_text} <break time='300ms'/> You can say {options_text}.</speak>"
-            else:
-                full_question = question_text
-                ssml = f"<speak>{question_text}</speak>"
+            full_question, ssml = _voice_question(question_text, tuple(options) if options else None)
         else:
             full_question = question_text
             ssml = None
@@ -85,6 +101,51 @@ class ClarificationHandler:
             }
         }
     
+    @staticmethod
+    def get_compound_question(intent: str, extracted_entities: dict, input_mode: str = "text") -> Optional[dict]:
+        """
+        Ask for ALL missing fields in a single question.
+        The user's reply is then parsed with one LLM call instead of one round-trip per field.
+        """
+        missing = ClarificationHandler.detect_missing_fields(intent, extracted_entities)
+        
+        if len(missing) <= 1:
+            clarification = ClarificationHandler.get_next_question(intent, extracted_entities, input_mode)
+            if clarification:
+                clarification["missing_fields"] = missing
+            return clarification
+        
+        question_configs = {field: get_missing_field_question(intent, field) for field in missing}
+        question_text = " ".join(
+            config.get("question", f"What should the {field} be?")
+            for field, config in question_configs.items()
+        )
+        field_options = {
+            field: config["options"]
+            for field, config in question_configs.items()
+            if config.get("options")
+        }
+        
+        if input_mode == "voice":
+            ssml = f"<speak>{question_text}</speak>"
+        else:
+            ssml = None
+        
+        return {
+            "needs_clarification": True,
+            "missing_field": missing[0],
+            "missing_fields": missing,
+            "question": question_text,
+            "options": None,
+            "field_options": field_options,
+            "response_mode": input_mode,
+            "ssml": ssml,
+            "partial_context": {
+                "intent": intent,
+                **extracted_entities
+            }
+        }
+    
     @staticmethod
     def merge_context(previous_context: dict, new_field: str, new_value: str) -> dict:
         """Merge new answer into existing context."""
@@ -100,6 +161,16 @@ class ClarificationHandler:
         
         return updated
     
+    @staticmethod
+    def merge_many(previous_context: dict, answers: dict) -> dict:
+        """Merge several answers at once, skipping fields the user didn't answer."""
+        updated = previous_context.copy()
+        for field, value in answers.items():
+            if value in (None, ""):
+                continue
+            updated = ClarificationHandler.merge_context(updated, field, str(value))
+        return updated
+    
     @staticmethod
     def generate_confirmation(automation: dict, input_mode: str = "text") -> dict:
         """Generate a confirmation message after successful automation creation."""
@@ -116,15 +187,12 @@ class ClarificationHandler:
         else:
             timing = "when you trigger it"
         
-        # Find notification channel
-        channel = "notify you"
-        for step in steps:
-            if step.get("type") == "send_whatsapp":
-                channel = "message you on WhatsApp"
-            elif step.get("type") == "send_email":
-                channel = "email you"
-            elif step.get("type") == "send_notification":
-                channel = "send you a notification"
+        # Find notification channel (the last notification step decides, as before)
+        channel = next(
+            (_CONFIRMATION_CHANNELS[step.get("type")] for step in reversed(steps)
+             if step.get("type") in _CONFIRMATION_CHANNELS),
+            "notify you"
+        )
         
         text = f"Done! I'll {channel} {timing}."
         
@@ -5,7 +5,6 @@ Environment variables, constants, and dynamic registry loading.
 """
 
 import os
-import re
 import logging
 from pathlib import Path
 from dotenv import load_dotenv
@@ -16,14 +15,39 @@ logger = logging.getLogger(__name__)
 env_path = Path(__file__).parent / ".env"
 load_dotenv(dotenv_path=env_path, override=True)
 
-# OpenRouter API Key (get free at https://openrouter.ai/keys)
-OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY", "")
+def _api_key_list(name: str) -> list:
+    """Keys from <NAME>S (comma-separated) plus the single <NAME> key, de-duplicated."""
+    keys = [key.strip() for key in os.getenv(f"{name}S", "").split(",") if key.strip()]
+    single = os.getenv(name, "")
+    if single and single not in keys:
+        keys.insert(0, single)
+    return keys
 
-# Gemini API Key (primary LLM)
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
+# OpenRouter API Key(s) (get free at https://openrouter.ai/keys)
+# Set OPENROUTER_API_KEYS=key1,key2 to round-robin across several accounts
+OPENROUTER_API_KEYS = _api_key_list("OPENROUTER_API_KEY")
+OPENROUTER_API_KEY = OPENROUTER_API_KEYS[0] if OPENROUTER_API_KEYS else ""
+
+# Gemini API Key(s) (primary LLM) — GEMINI_API_KEYS=key1,key2 to round-robin
+GEMINI_API_KEYS = _api_key_list("GEMINI_API_KEY")
+GEMINI_API_KEY = GEMINI_API_KEYS[0] if GEMINI_API_KEYS else ""
+
+# Seconds a key is skipped after it gets rate limited (429) without a Retry-After
+API_KEY_COOLDOWN_SECONDS = float(os.getenv("API_KEY_COOLDOWN_SECONDS", "30"))
+
+# Uvicorn worker processes (render.yaml's --workers). Breakers, key cooldowns and
+# rate caps live in each worker's memory, so they are all per worker.
+WEB_CONCURRENCY = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+
+# A provider is skipped after this many consecutive failures (counted per worker), for CIRCUIT_RESET_SECONDS
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "3"))
+CIRCUIT_RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS", "30"))
 
 # Groq API Key (get free at https://console.groq.com — 30 RPM, 14,400 req/day free)
 GROQ_API_KEY = os.getenv("GROQ_API_KEY", "")
+# Client-side request cap for Groq's free tier (0 = unlimited), for the whole service;
+# each worker gets GROQ_RPM / WEB_CONCURRENCY
+GROQ_RPM = float(os.getenv("GROQ_RPM", "30"))
 GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
 
 # HuggingFace Inference API Key (get free at https://huggingface.co/settings/tokens)
@@ -36,9 +60,38 @@ LLM_MODEL = os.getenv("LLM_MODEL", "meta-llama/llama-3.2-3b-instruct:free")
 # Gemini model (primary)
 GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
 
+# Seconds to wait on a provider before racing the next one in the cascade (0 = strictly sequential)
+LLM_HEDGE_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_DELAY_SECONDS", "4.0"))
+# Max extra providers started by hedging while earlier ones are still in flight (failures always fall through)
+LLM_MAX_HEDGES = int(os.getenv("LLM_MAX_HEDGES", "1"))
+
+# Concurrent identical LLM calls share one provider request (false = every call goes out)
+LLM_COALESCE_ENABLED = os.getenv("LLM_COALESCE_ENABLED", "true").lower() == "true"
+
+# Connections pre-opened per provider at startup, and how often idle ones are kept alive (0 = off)
+LLM_WARMUP_CONNECTIONS = int(os.getenv("LLM_WARMUP_CONNECTIONS", "2"))
+LLM_KEEPALIVE_SECONDS = float(os.getenv("LLM_KEEPALIVE_SECONDS", "25"))
+
+# Build simple stock/crypto monitors locally without calling an LLM (see fast_path.py)
+FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "true").lower() == "true"
+
+# Response cache for LLM-backed endpoints (TTL 0 disables caching)
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "3600"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024"))
+
+# Input size guards: user text per request, and the assembled prompt sent to an LLM
+MAX_USER_TEXT_CHARS = int(os.getenv("MAX_USER_TEXT_CHARS", "4000"))
+MAX_PROMPT_CHARS = int(os.getenv("MAX_PROMPT_CHARS", "100000"))
+
+# Root log level (e.g. WARNING in production to skip per-request INFO lines)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
 # Node.js backend URL (for registry sync)
 BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:3000")
 
+# How often the tool registry is re-fetched in the background (0 = startup only)
+REGISTRY_REFRESH_SECONDS = float(os.getenv("REGISTRY_REFRESH_SECONDS", "300"))
+
 # Allowed steps registry (FALLBACK — prefer dynamic registry from Node.js)
 # Updated to match all tools in toolDefinitions.json
 ALLOWED_STEPS = [
@@ -81,6 +134,9 @@ ALLOWED_STEPS = [
     'list_calendar_events'
 ]
 
+# O(1) membership view of ALLOWED_STEPS (the list keeps prompt/error-message order)
+ALLOWED_STEPS_SET = frozenset(ALLOWED_STEPS)
+
 # Allowed trigger types
 ALLOWED_TRIGGERS = [
     "manual",
@@ -91,15 +147,21 @@ ALLOWED_TRIGGERS = [
     "event"
 ]
 
-# Valid interval pattern (flexible - allows any reasonable interval)
-INTERVAL_PATTERN = re.compile(r'^(\d{1,3})(s|m|h|d|w)$')
+# Valid interval: 1-3 ASCII digits + unit (flexible - allows any reasonable interval)
+INTERVAL_UNITS = frozenset("smhdw")
 
 def validate_interval_format(interval: str) -> bool:
     """
     Validate interval format without restricting to specific values.
     Accepts: 1s, 2m, 30m, 1h, 2d, etc.
     """
-    if not isinstance(interval, str):
+    if not isinstance(interval, str) or not interval:
         return False
-    return INTERVAL_PATTERN.match(interval.lower()) is not None
+    amount = interval[:-1]
+    return (
+        interval[-1].lower() in INTERVAL_UNITS
+        and 1 <= len(amount) <= 3
+        and amount.isascii()
+        and amount.isdigit()
+    )
 
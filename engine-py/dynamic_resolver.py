@@ -12,6 +12,7 @@ Includes auto-retry with error correction (up to 3 attempts per gap).
 """
 
 import ast
+import asyncio
 import json
 import logging
 import os
@@ -155,7 +156,7 @@ def _test_generated_code(generated_code: str, inputs: dict) -> dict:
 
 # ─── Core Resolver ──────────────────────────────────────────────────────
 
-def resolve_capability_gaps(gaps: list, call_llm_fn, code_gen_prompt: str, original_request: str = "") -> list:
+async def resolve_capability_gaps(gaps: list, call_llm_fn, code_gen_prompt: str, original_request: str = "") -> list:
     """
     For each capability gap, generate a Python function via LLM.
     Includes auto-retry (up to 3 attempts) with error correction prompts.
@@ -163,7 +164,7 @@ def resolve_capability_gaps(gaps: list, call_llm_fn, code_gen_prompt: str, origi
     Args:
         gaps: List of gap dicts from intent analysis, e.g.:
             [{ "capability": "fetch_rss_feed_custom", "description": "...", "inputs": {...} }]
-        call_llm_fn: The call_llm function from app.py (uses multi-LLM cascade)
+        call_llm_fn: The async call_llm function from app.py (uses multi-LLM cascade)
         code_gen_prompt: The CODE_GENERATION_PROMPT template string
         original_request: The original user request text for context
 
@@ -180,7 +181,7 @@ def resolve_capability_gaps(gaps: list, call_llm_fn, code_gen_prompt: str, origi
         logger.info(f"🔧 Resolving capability gap: {capability}")
 
         # Check for previously learned tool first
-        learned = _lookup_learned_tool(capability)
+        learned = await asyncio.to_thread(_lookup_learned_tool, capability)
         if learned:
             dynamic_step = {
                 "type": "dynamic",
@@ -211,7 +212,7 @@ def resolve_capability_gaps(gaps: list, call_llm_fn, code_gen_prompt: str, origi
                 logger.info(f"🔄 Attempt {attempt}/{MAX_CODE_GEN_ATTEMPTS} for: {capability}")
 
                 # Call LLM cascade to generate code
-                raw_response = call_llm_fn(prompt)
+                raw_response = await call_llm_fn(prompt)
 
                 # Extract code from response (handle markdown code blocks)
                 code = _extract_code(raw_response)
@@ -231,7 +232,7 @@ def resolve_capability_gaps(gaps: list, call_llm_fn, code_gen_prompt: str, origi
                     continue
 
                 # Quick test run with the gap's example inputs
-                test_result = _test_generated_code(code, inputs)
+                test_result = await asyncio.to_thread(_test_generated_code, code, inputs)
 
                 if test_result.get("success") and not test_result.get("result", {}).get("error"):
                     # Code works — use it
@@ -296,11 +297,15 @@ def _extract_code(response: str) -> str:
     """
     response = response.strip()
 
-    # Try to find code in ```python ... ``` blocks
-    import re
-    code_match = re.search(r'```(?:python)?\s*([\s\S]*?)\s*```', response)
-    if code_match:
-        return code_match.group(1).strip()
+    # Try to find code in ```python ... ``` blocks (two str.find scans, no regex)
+    fence = response.find("```")
+    if fence != -1:
+        start = fence + 3
+        if response.startswith("python", start):
+            start += len("python")
+        end = response.find("```", start)
+        if end != -1:
+            return response[start:end].strip()
 
     # If no code block, check if the response itself looks like Python code
     # (starts with def, import, or a comment)
@@ -0,0 +1,215 @@
+"""
+Deterministic Fast Path for Simple Requests
+
+Builds automation JSON locally — with zero LLM calls — for the common
+"send me <TICKER> price every <interval> [by <channel>]" requests:
+- Stock and crypto price monitors only
+- Exactly one symbol and an explicit interval must be present
+- Anything conditional, multi-step or webhook-based falls through to the LLM
+
+Output follows the same shape and placeholders as the generation prompt examples.
+try_fast_extract answers intent extraction for the same requests.
+"""
+
+import re
+from typing import Optional, Tuple
+
+from config import validate_interval_format
+
+# Longer requests are almost never the simple pattern handled here
+MAX_FAST_PATH_CHARS = 150
+
+_STOCK_RE = re.compile(r'\b(stocks?|shares?|ticker)\b', re.IGNORECASE)
+_CRYPTO_RE = re.compile(r'\b(crypto|cryptocurrency|coin)\b', re.IGNORECASE)
+_CRYPTO_NAMES_RE = re.compile(r'\b(bitcoin|ethereum|solana|dogecoin)\b', re.IGNORECASE)
+# Bare uppercase words only count as tickers when they are known symbols ("Get IT stock" is not IT);
+# anything else must be written as $TICKER
+_TICKER_RE = re.compile(r'\$([A-Za-z]{1,5})\b|\b([A-Z]{2,5})\b')
+
+# Conditions, thresholds, transformations and destinations that need the planner
+_COMPLEX_RE = re.compile(
+    r'\b(if|when|unless|above|below|over|under|drops?|falls?|rises?|exceeds?|crosses|'
+    r'summari[sz]e|sheets?|save|log|compare|news|and then|then|discord|slack|telegram|webhook|'
+    r'teams|chat|call|phone|ring|dm|tweet|post)\b'
+    r'|\$\s*\d|[%₹<>]',
+    re.IGNORECASE
+)
+
+# Concrete recipients (email addresses, phone numbers) have to be carried into the steps by the planner
+_EMAIL_RE = re.compile(r'[\w.+-]+@[\w-]+\.[\w.-]+')
+_PHONE_RE = re.compile(r'\+?\d[\d\s().-]{6,}\d')
+_DESTINATION_RE = re.compile(
+    r'\b(?:to|via|on|by|through|using)\s+(?:my\s+|the\s+|a\s+)?([a-z][\w-]*)',
+    re.IGNORECASE
+)
+
+_INTERVAL_RE = re.compile(
+    r'\bevery\s+(\d{1,3})\s*(seconds?|secs?|s|minutes?|mins?|m|hours?|hrs?|h|days?|d|weeks?|w)\b',
+    re.IGNORECASE
+)
+_INTERVAL_WORD_RE = re.compile(r'\b(?:every\s+(second|minute|hour|day|week)|(hourly|daily|weekly))\b', re.IGNORECASE)
+
+_CHANNEL_RE = re.compile(r'\b(e-?mail|mail|whatsapp|wa|sms|text me|notify|notification)\b', re.IGNORECASE)
+
+CRYPTO_NAME_SYMBOLS = {
+    "bitcoin": "BTC",
+    "ethereum": "ETH",
+    "solana": "SOL",
+    "dogecoin": "DOGE",
+}
+
+# Symbols recognised without a $ prefix
+KNOWN_STOCK_SYMBOLS = frozenset({
+    "AAPL", "MSFT", "GOOG", "GOOGL", "AMZN", "META", "TSLA", "NVDA", "NFLX", "AMD",
+    "INTC", "IBM", "ORCL", "CRM", "ADBE", "UBER", "DIS", "JPM", "BAC", "WMT",
+    "KO", "PEP", "NKE", "TCS", "INFY", "WIPRO", "SBIN", "ITC",
+})
+KNOWN_CRYPTO_SYMBOLS = frozenset({
+    "BTC", "ETH", "SOL", "DOGE", "XRP", "ADA", "BNB", "DOT", "LTC", "MATIC",
+    "AVAX", "SHIB", "TRX", "LINK",
+})
+
+_INTERVAL_WORDS = {
+    "second": "1s", "minute": "1m", "hour": "1h", "day": "1d", "week": "1w",
+    "hourly": "1h", "daily": "1d", "weekly": "1w",
+}
+
+_CHANNEL_NAMES = {
+    "email": "email", "e-mail": "email", "mail": "email",
+    "whatsapp": "whatsapp", "wa": "whatsapp",
+    "sms": "sms", "text me": "sms",
+    "notify": "notify", "notification": "notify",
+}
+
+# Words allowed after "to/via/on ..." besides the channel names themselves
+_DESTINATION_WORDS = frozenset(_CHANNEL_NAMES) | {"me", "notifications", "text"}
+
+
+def _extract_interval(text: str) -> Optional[str]:
+    """Explicit interval like 'every 5 minutes' / 'hourly' → '5m' / '1h'."""
+    matches = _INTERVAL_RE.findall(text)
+    word_matches = _INTERVAL_WORD_RE.findall(text)
+    if len(matches) + len(word_matches) != 1:
+        return None
+
+    if matches:
+        amount, unit = matches[0]
+        interval = f"{int(amount)}{unit[0].lower()}"
+    else:
+        every_word, adverb = word_matches[0]
+        interval = _INTERVAL_WORDS[(every_word or adverb).lower()]
+
+    return interval if validate_interval_format(interval) else None
+
+
+def _extract_channel(text: str) -> Tuple[bool, Optional[str]]:
+    """
+    (ok, channel): the single named channel, None if none is named.
+    ok is False if the channel is ambiguous or the destination is anything we
+    cannot build here (an address, a number, an unrecognised service).
+    """
+    if _EMAIL_RE.search(text) or _PHONE_RE.search(text):
+        return False, None
+    if any(word.lower() not in _DESTINATION_WORDS for word in _DESTINATION_RE.findall(text)):
+        return False, None
+
+    channels = {_CHANNEL_NAMES[m.lower()] for m in _CHANNEL_RE.findall(text)}
+    if len(channels) > 1:
+        return False, None
+    return True, (channels.pop() if channels else None)
+
+
+def _extract_symbol(text: str, crypto: bool) -> Optional[str]:
+    """Exactly one $TICKER / known symbol (or well-known coin name for crypto)."""
+    known = KNOWN_CRYPTO_SYMBOLS if crypto else KNOWN_STOCK_SYMBOLS
+    symbols = set()
+    for prefixed, bare in _TICKER_RE.findall(text):
+        if prefixed:
+            symbols.add(prefixed.upper())
+        elif bare in known:
+            symbols.add(bare)
+    if crypto:
+        symbols.update(CRYPTO_NAME_SYMBOLS[n.lower()] for n in _CRYPTO_NAMES_RE.findall(text))
+    return symbols.pop() if len(symbols) == 1 else None
+
+
+def _notification_step(channel: str, symbol: str, label: str) -> dict:
+    message = f"Current {symbol} price: {{{{step_1.price}}}}"
+    if channel == "email":
+        return {"type": "send_email", "to": "user@example.com", "subject": f"{symbol} {label} Update", "body": message}
+    if channel == "whatsapp":
+        return {"type": "send_whatsapp", "to": "+1234567890", "message": message}
+    if channel == "sms":
+        return {"type": "send_sms", "to": "+1234567890", "message": message}
+    return {"type": "notify", "message": message}
+
+
+def _parse_simple_monitor(user_request: str) -> Optional[dict]:
+    """
+    Pull (kind, symbol, interval, channel) out of a simple price-monitor request.
+    Returns None whenever the request is not unambiguously that pattern.
+    """
+    text = user_request.strip()
+    if not text or len(text) > MAX_FAST_PATH_CHARS or _COMPLEX_RE.search(text):
+        return None
+
+    is_stock = bool(_STOCK_RE.search(text))
+    is_crypto = bool(_CRYPTO_RE.search(text) or _CRYPTO_NAMES_RE.search(text))
+    if is_stock == is_crypto:
+        return None
+
+    symbol = _extract_symbol(text, crypto=is_crypto)
+    interval = _extract_interval(text)
+    channel_ok, channel = _extract_channel(text)
+    if not (symbol and interval and channel_ok):
+        return None
+
+    return {"crypto": is_crypto, "symbol": symbol, "interval": interval, "channel": channel}
+
+
+def try_fast_path(user_request: str) -> Optional[dict]:
+    """
+    Build a price-monitor automation locally if the request is unambiguous.
+    Returns None whenever the LLM planner should handle it instead.
+    """
+    parsed = _parse_simple_monitor(user_request)
+    if parsed is None:
+        return None
+
+    symbol, interval = parsed["symbol"], parsed["interval"]
+    channel = parsed["channel"] or "notify"
+    is_crypto = parsed["crypto"]
+
+    label = "Crypto" if is_crypto else "Stock"
+    fetch_type = "fetch_crypto_price" if is_crypto else "fetch_stock_price"
+    destination = "notification" if channel == "notify" else channel
+
+    return {
+        "name": f"{symbol} {label} Price Monitor",
+        "description": f"Fetch {symbol} price every {interval} and send {destination}",
+        "trigger": {"type": "interval", "every": interval},
+        "steps": [
+            {"type": fetch_type, "symbol": symbol},
+            _notification_step(channel, symbol, label)
+        ]
+    }
+
+
+def try_fast_extract(user_request: str) -> Optional[dict]:
+    """
+    Intent + entities for a simple price-monitor request, in the same shape as
+    UNIFIED_EXTRACTION_PROMPT output. Like the prompt, notification_channel is
+    only included when the user actually named one.
+    """
+    parsed = _parse_simple_monitor(user_request)
+    if parsed is None:
+        return None
+
+    entities = {"symbol": parsed["symbol"], "interval": parsed["interval"]}
+    if parsed["channel"]:
+        entities["notification_channel"] = "notification" if parsed["channel"] == "notify" else parsed["channel"]
+
+    return {
+        "intent": "crypto_monitor" if parsed["crypto"] else "stock_monitor",
+        "entities": entities
+    }
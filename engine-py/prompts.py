@@ -8,9 +8,12 @@ Key changes from v1:
 - All original prompts preserved for backward compatibility
 """
 
+import atexit
+import functools
 import json
 import logging
 import httpx
+import orjson
 from config import ALLOWED_STEPS, ALLOWED_TRIGGERS
 
 logger = logging.getLogger(__name__)
@@ -22,34 +25,57 @@ _registry_cache = {
     "tools": None,
     "prompt_text": None,
     "tool_names": None,
-    "version": None
+    "tool_names_text": None,
+    "version": None,
+    "etag": None,  # Validator for conditional refreshes (Express sends one by default)
+    "data": None   # Last full payload, returned again on 304 Not Modified
 }
 
+# Shared keep-alive client for registry fetches (startup, periodic refresh, /refresh-registry).
+# httpx.Client is thread-safe, so the asyncio.to_thread callers can share it.
+_registry_client = httpx.Client(
+    timeout=5.0,
+    limits=httpx.Limits(max_keepalive_connections=2, max_connections=4, keepalive_expiry=60.0)
+)
+atexit.register(_registry_client.close)
+
 def fetch_registry(base_url: str = "http://localhost:3000") -> dict:
     """Fetch tool definitions from the Node.js registry endpoint."""
     try:
-        with httpx.Client(timeout=5.0) as client:
-            response = client.get(f"{base_url}/registry/prompt")
-            response.raise_for_status()
-            data = response.json()
-            
-            _registry_cache["prompt_text"] = data.get("promptText", "")
-            _registry_cache["tool_names"] = data.get("toolNames", [])
-            _registry_cache["version"] = data.get("registryVersion", "unknown")
-            
-            logger.info(f"✅ Registry loaded: {len(_registry_cache['tool_names'])} tools (v{_registry_cache['version']})")
-            return data
+        headers = {"If-None-Match": _registry_cache["etag"]} if _registry_cache["etag"] else None
+        response = _registry_client.get(f"{base_url}/registry/prompt", headers=headers)
+        if response.status_code == 304 and _registry_cache["data"] is not None:
+            logger.debug("Registry unchanged (304), keeping cached tools")
+            return _registry_cache["data"]
+        response.raise_for_status()
+        data = orjson.loads(response.content)
+        
+        # One dict.update with str keys runs entirely under the GIL, so readers on
+        # other threads see either the old registry or the new one, never a mix
+        _registry_cache.update({
+            "etag": response.headers.get("ETag"),
+            "data": data,
+            "prompt_text": data.get("promptText", ""),
+            "tool_names": data.get("toolNames", []),
+            "tool_names_text": None,  # Re-joined on next use
+            "version": data.get("registryVersion", "unknown"),
+        })
+        
+        logger.info(f"✅ Registry loaded: {len(_registry_cache['tool_names'])} tools (v{_registry_cache['version']})")
+        return data
     except Exception as e:
         logger.warning(f"⚠️ Could not fetch registry from {base_url}: {e}. Using hardcoded ALLOWED_STEPS.")
         return None
 
+# Fallback tool list from config.py (ALLOWED_STEPS is static, so render it once)
+_FALLBACK_TOOL_TEXT = "\n".join(f"- {step}" for step in ALLOWED_STEPS)
+
 def get_tool_prompt_text() -> str:
     """Get tool descriptions for prompt injection. Uses registry if available, falls back to ALLOWED_STEPS."""
     if _registry_cache["prompt_text"]:
         return _registry_cache["prompt_text"]
     
-    # Fallback to hardcoded list from config.py
-    return "\n".join(f"- {step}" for step in ALLOWED_STEPS)
+    return _FALLBACK_TOOL_TEXT
 
 def get_allowed_tool_names() -> list:
     """Get list of allowed tool names. Uses registry if available."""
@@ -57,10 +83,16 @@ def get_allowed_tool_names() -> list:
         return _registry_cache["tool_names"]
     return ALLOWED_STEPS
 
+def get_allowed_tool_names_text() -> str:
+    """Comma-joined allowed tool names, built once per registry load."""
+    if _registry_cache["tool_names_text"] is None:
+        _registry_cache["tool_names_text"] = ", ".join(get_allowed_tool_names())
+    return _registry_cache["tool_names_text"]
+
 # ─── System Prompts ──────────────────────────────────────────────────────
 
 # System prompt for intent parsing (unchanged from v1)
-PARSE_INTENT_PROMPT = f"""You are an intent parser for an automation system.
+PARSE_INTENT_PROMPT = """You are an intent parser for an automation system.
 
 Extract the user's intent from their natural language request.
 
@@ -76,10 +108,17 @@ RULES:
 - Use interval format: <number><unit> (e.g., 1m, 5m, 30s, 1h, 2d)
 
 Example input: "Send me AAPL stock price every 5 minutes"
-Example output: {{"intent": "stock_monitor", "entities": {{"symbol": "AAPL", "interval": "5m"}}, "channel": "notification"}}
+Example output: {"intent": "stock_monitor", "entities": {"symbol": "AAPL", "interval": "5m"}, "channel": "notification"}
 """
 
 
+# User-turn half of the generation prompt (the variable part)
+GENERATION_REQUEST_TEMPLATE = """Now generate the automation JSON for this request:
+User request: {user_request}
+
+Return ONLY valid JSON:"""
+
+
 def build_generation_prompt(user_request: str, tool_prompt_text: str = None) -> str:
     """
     Build the automation generation prompt with dynamic tool injection.
@@ -91,9 +130,27 @@ def build_generation_prompt(user_request: str, tool_prompt_text: str = None) ->
     - ContextMemory chaining instructions for cross-step data flow
     - Uses only interval triggers (1d for daily) — no 'daily' trigger type
     """
+    system_prompt = build_generation_system_prompt(tool_prompt_text)
+    return f"{system_prompt}\n\n{GENERATION_REQUEST_TEMPLATE.format(user_request=user_request)}"
+
+
+def build_generation_system_prompt(tool_prompt_text: str = None) -> str:
+    """
+    Build the static instruction half of the generation prompt (no user text),
+    suitable for a system message so providers can cache it as a prefix.
+    """
     if tool_prompt_text is None:
         tool_prompt_text = get_tool_prompt_text()
     
+    return _render_generation_system_prompt(tool_prompt_text)
+
+
+@functools.lru_cache(maxsize=8)
+def _render_generation_system_prompt(tool_prompt_text: str) -> str:
+    """
+    Render the generation system prompt once per registry text, so every
+    request sends a byte-identical prefix until the registry changes.
+    """
     return f"""You are an automation planner. Convert user instructions into a structured automation JSON.
 
 Return ONLY valid JSON. No markdown, no explanation, no code blocks, no preamble.
@@ -372,20 +429,63 @@ GOOGLE TOOLS (require user's Google OAuth connection):
 - upload_to_drive: Upload a file to Google Drive
 - list_drive_files: List files in Google Drive
 - create_calendar_event: Create a Google Calendar event. IMPORTANT: for startTime, ALWAYS use the user's exact words as natural language (e.g. "tomorrow 10:00 AM", "today 3:00 PM", "next monday 9:00 AM"). NEVER convert to ISO 8601 or UTC. The backend handles timezone conversion.
-- list_calendar_events: List upcoming calendar events
+- list_calendar_events: List upcoming calendar events"""
 
-Now generate the automation JSON for this request:
-User request: {user_request}
 
-Return ONLY valid JSON:"""
+# Keep old prompt for backward compatibility — built lazily on first access (PEP 562),
+# since nothing in the engine reads it and it would otherwise render at every import
+def __getattr__(name: str):
+    if name == "GENERATE_AUTOMATION_PROMPT":
+        prompt = build_generation_prompt("{user_request_placeholder}")
+        globals()[name] = prompt
+        return prompt
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
-# Keep old prompt for backward compatibility
-GENERATE_AUTOMATION_PROMPT = build_generation_prompt("{user_request_placeholder}")
+# ─── Retry Correction Prompt ─────────────────────────────────────────────
 
+# User-turn half of the retry prompt (the variable part)
+RETRY_CORRECTION_REQUEST_TEMPLATE = """Your previous attempt to generate automation JSON failed.
 
-# ─── Retry Correction Prompt ─────────────────────────────────────────────
+PREVIOUS ERROR:
+{error}
+
+INVALID OUTPUT (what you generated):
+{invalid_output}
 
+ORIGINAL USER REQUEST:
+{user_request}
+
+Corrected JSON output:"""
+
+
+def build_retry_system_prompt(allowed_steps: str = None) -> str:
+    """
+    Build the static instruction half of the retry prompt (no error or user text),
+    so retries also send a cacheable system prefix.
+    """
+    if allowed_steps is None:
+        allowed_steps = get_allowed_tool_names_text()
+
+    return _render_retry_system_prompt(allowed_steps)
+
+
+@functools.lru_cache(maxsize=8)
+def _render_retry_system_prompt(allowed_steps: str) -> str:
+    """Render the retry system prompt once per allowed-steps list."""
+    return f"""You are an automation planner correcting your own invalid automation JSON.
+
+FIX INSTRUCTIONS:
+1. Analyze the error message in the user turn
+2. Fix ONLY the specific issue mentioned in the error
+3. Return a corrected JSON object
+4. Output ONLY valid JSON — NO markdown, NO code blocks, NO explanations
+5. Do NOT change parts of the JSON that were already correct
+
+ALLOWED STEP TYPES: {allowed_steps}"""
+
+
+# Keep old single-string prompt for backward compatibility
 RETRY_CORRECTION_PROMPT = """You are an automation planner. Your previous attempt to generate automation JSON failed.
 
 PREVIOUS ERROR:
@@ -411,7 +511,7 @@ Corrected JSON output:"""
 
 # ─── Entity Extraction Prompt (unchanged from v1) ────────────────────────
 
-ENTITY_EXTRACTION_PROMPT = f"""You are an entity extractor for an automation system.
+ENTITY_EXTRACTION_PROMPT = """You are an entity extractor for an automation system.
 
 Extract all information from the user's request into a structured format.
 
@@ -437,13 +537,78 @@ RULES:
 Examples:
 
 Input: "Check SBIN stock every 5 minutes"
-Output: {{"intent": "stock_monitor", "entities": {{"symbol": "SBIN", "interval": "5m"}}}}
+Output: {"intent": "stock_monitor", "entities": {"symbol": "SBIN", "interval": "5m"}}
+
+Input: "WhatsApp me AAPL updates every hour"
+Output: {"intent": "stock_monitor", "entities": {"symbol": "AAPL", "interval": "1h", "notification_channel": "whatsapp"}}
+
+Input: "Send me Bitcoin price on email daily"
+Output: {"intent": "crypto_monitor", "entities": {"symbol": "BTC", "interval": "1d", "notification_channel": "email"}}
+"""
+
+
+# ─── Unified Extraction Prompt ───────────────────────────────────────────
+# Shared by /parse-intent and the first /conversation turn so both read the
+# same cached result; channel and missing fields are derived locally.
+
+UNIFIED_EXTRACTION_PROMPT = """You are an intent parser and entity extractor for an automation system.
+
+Extract the user's intent and all information from their request.
+
+Return a JSON object with:
+- "intent": one of ["stock_monitor", "crypto_monitor", "job_alert", "price_alert", "notification", "email_alert", "custom"]
+- "entities": object containing extracted values
+
+ENTITIES TO EXTRACT (include ONLY if present in the request):
+- symbol: stock ticker or crypto symbol (e.g., "AAPL", "BTC", "SBIN")
+- interval: time interval (format: <number><unit> like 1m, 2m, 30s, 1h, 2d)
+- notification_channel: where to send updates ("whatsapp", "email", "sms", "notification")
+- query: search query (for job alerts)
+- condition: price condition (e.g., "above 150", "below 100")
+- threshold: price threshold number
+- recipient: email address or phone number, if given
+
+RULES:
+- Output ONLY valid JSON - no explanations, no markdown, no code blocks
+- Only include fields that are EXPLICITLY mentioned
+- Do NOT guess or infer missing information
+- If no channel is mentioned, do NOT include notification_channel
+
+Examples:
+
+Input: "Check SBIN stock every 5 minutes"
+Output: {"intent": "stock_monitor", "entities": {"symbol": "SBIN", "interval": "5m"}}
 
 Input: "WhatsApp me AAPL updates every hour"
-Output: {{"intent": "stock_monitor", "entities": {{"symbol": "AAPL", "interval": "1h", "notification_channel": "whatsapp"}}}}
+Output: {"intent": "stock_monitor", "entities": {"symbol": "AAPL", "interval": "1h", "notification_channel": "whatsapp"}}
 
 Input: "Send me Bitcoin price on email daily"
-Output: {{"intent": "crypto_monitor", "entities": {{"symbol": "BTC", "interval": "1d", "notification_channel": "email"}}}}
+Output: {"intent": "crypto_monitor", "entities": {"symbol": "BTC", "interval": "1d", "notification_channel": "email"}}
+"""
+
+
+# ─── Clarification Answers Prompt ────────────────────────────────────────
+
+CLARIFICATION_ANSWERS_PROMPT = """You are an entity extractor for an automation system.
+
+The user was asked for several missing details of a "{intent}" automation at once
+and replied in a single message. Extract a value for each of these fields: {fields}
+
+FIELD FORMATS:
+- symbol: stock ticker or crypto symbol (e.g., "AAPL", "BTC")
+- interval: <number><unit> like 1m, 5m, 1h, 1d
+- notification_channel: one of "whatsapp", "email", "sms", "notification"
+- condition: "above" or "below"
+- threshold: price threshold number
+
+RULES:
+- Output ONLY valid JSON - no explanations, no markdown
+- Use exactly the field names listed above as keys
+- Use null for any field the user did not answer
+
+Example (fields: symbol, interval):
+Input: "Tesla, every hour"
+Output: {{"symbol": "TSLA", "interval": "1h"}}
 """
 
 
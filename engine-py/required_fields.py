@@ -117,35 +117,33 @@ def get_missing_field_question(intent: str, field: str) -> dict:
     }
 
 
+# Clarification answers -> step type / interval string
+CHANNEL_RESPONSES = {
+    "whatsapp": "send_whatsapp",
+    "email": "send_email",
+    "in-app": "send_notification",
+    "in-app notification": "send_notification",
+    "notification": "send_notification",
+    "sms": "send_sms"
+}
+
+INTERVAL_RESPONSES = {
+    "every minute": "1m",
+    "every 5 minutes": "5m",
+    "every 15 minutes": "15m",
+    "every 30 minutes": "30m",
+    "every hour": "1h",
+    "hourly": "1h",
+    "daily": "1d",
+    "weekly": "1w"
+}
+
+
 def normalize_channel_response(response: str) -> str:
     """Normalize user's channel response to step type."""
-    response_lower = response.lower().strip()
-    
-    channel_mapping = {
-        "whatsapp": "send_whatsapp",
-        "email": "send_email",
-        "in-app": "send_notification",
-        "in-app notification": "send_notification",
-        "notification": "send_notification",
-        "sms": "send_sms"
-    }
-    
-    return channel_mapping.get(response_lower, "send_notification")
+    return CHANNEL_RESPONSES.get(response.strip().lower(), "send_notification")
 
 
 def normalize_interval_response(response: str) -> str:
     """Normalize user's interval response to format."""
-    response_lower = response.lower().strip()
-    
-    interval_mapping = {
-        "every minute": "1m",
-        "every 5 minutes": "5m",
-        "every 15 minutes": "15m",
-        "every 30 minutes": "30m",
-        "every hour": "1h",
-        "hourly": "1h",
-        "daily": "1d",
-        "weekly": "1w"
-    }
-    
-    return interval_mapping.get(response_lower, response)
+    return INTERVAL_RESPONSES.get(response.strip().lower(), response)
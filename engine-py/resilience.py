@@ -0,0 +1,180 @@
+"""
+Provider Resilience Helpers
+
+Keeps LLM provider calls healthy under rate limits:
+- ApiKeyPool: round-robin over several API keys, skipping keys cooling down after a 429
+- CircuitBreaker: skip a provider after repeated failures until a probe succeeds
+- TokenBucket: client-side requests-per-minute cap, so known quota limits are not hit
+- SingleFlight: concurrent identical calls share one in-flight request
+"""
+
+import asyncio
+import logging
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ApiKeyPool:
+    """
+    Round-robin pool of API keys for one provider.
+
+    A key that hits a 429 is parked until its cooldown ends. If every key is
+    cooling down, the one that frees up soonest is returned anyway.
+    Used from the event loop only, so no locking is needed.
+    """
+
+    def __init__(self, name: str, keys: list, cooldown_seconds: float = 30.0):
+        self.name = name
+        self.keys = list(keys)
+        self.cooldown_seconds = cooldown_seconds
+        self._next_index = 0
+        self._cooling_until = {}
+
+    def __bool__(self) -> bool:
+        return bool(self.keys)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def next_key(self) -> str:
+        """Return the next available key in rotation."""
+        if not self.keys:
+            return ""
+
+        now = time.monotonic()
+        for _ in range(len(self.keys)):
+            key = self.keys[self._next_index]
+            self._next_index = (self._next_index + 1) % len(self.keys)
+            if self._cooling_until.get(key, 0.0) <= now:
+                return key
+
+        # Everything is cooling down — use whichever recovers first
+        return min(self.keys, key=lambda k: self._cooling_until.get(k, 0.0))
+
+    def has_available_key(self) -> bool:
+        """True if at least one key is not cooling down."""
+        now = time.monotonic()
+        return any(self._cooling_until.get(key, 0.0) <= now for key in self.keys)
+
+    def mark_rate_limited(self, key: str, retry_after: Optional[float] = None):
+        """Park a key after a 429, for Retry-After seconds if the provider sent one."""
+        cooldown = retry_after if retry_after is not None else self.cooldown_seconds
+        self._cooling_until[key] = time.monotonic() + cooldown
+        if len(self.keys) > 1:
+            logger.warning(f"⚠️ {self.name} key #{self.keys.index(key) + 1} rate limited, cooling down {cooldown:.0f}s")
+
+
+class CircuitBreaker:
+    """
+    Per-provider circuit breaker.
+
+    Opens after `failure_threshold` consecutive failures (or immediately on a
+    429) for Retry-After / `reset_seconds`. Once that window ends, one probe
+    call is let through per window; a success closes the circuit again.
+    `rate_limited` says whether the last opening was caused by a 429.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 3, reset_seconds: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self._open_until = 0.0
+        self.rate_limited = False
+
+    @property
+    def is_open(self) -> bool:
+        return self._open_until > time.monotonic()
+
+    def allow(self) -> bool:
+        """True if a call may go out now (closed, or a half-open probe)."""
+        if self.failures < self.failure_threshold:
+            return True
+        now = time.monotonic()
+        if self._open_until > now:
+            return False
+        # Half-open: let this call probe, hold everything else for another window
+        self._open_until = now + self.reset_seconds
+        return True
+
+    def record_success(self):
+        if self.failures >= self.failure_threshold:
+            logger.info(f"✅ {self.name} circuit closed")
+        self.failures = 0
+        self._open_until = 0.0
+        self.rate_limited = False
+
+    def record_failure(self, rate_limited: bool = False, retry_after: Optional[float] = None):
+        """Count a failure; a 429 opens the circuit straight away."""
+        self.failures = self.failure_threshold if rate_limited else self.failures + 1
+        if self.failures >= self.failure_threshold:
+            window = retry_after if retry_after is not None else self.reset_seconds
+            self._open_until = time.monotonic() + window
+            self.rate_limited = rate_limited
+            logger.warning(f"🔌 {self.name} circuit open for {window:.0f}s")
+
+
+class TokenBucket:
+    """
+    Non-blocking requests-per-minute limiter.
+
+    try_acquire() takes a token if one is available; callers skip the
+    provider instead of waiting. A rate of 0 disables the limit.
+    """
+
+    def __init__(self, name: str, requests_per_minute: float):
+        self.name = name
+        self.capacity = requests_per_minute
+        self.tokens = requests_per_minute
+        self.rate_per_second = requests_per_minute / 60.0
+        self._updated_at = time.monotonic()
+
+    def try_acquire(self) -> bool:
+        if self.capacity <= 0:
+            return True
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated_at) * self.rate_per_second)
+        self._updated_at = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one in-flight task.
+
+    Later callers await the first caller's task instead of starting their own.
+    The task is cancelled only when every caller waiting on it has gone away.
+    Nothing is remembered after the task finishes — this is not a cache.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self.coalesced = 0
+
+    async def run(self, key, factory):
+        """Await factory() for this key, joining an identical call already in flight."""
+        entry = self._calls.get(key)
+        if entry is None:
+            entry = {"task": asyncio.create_task(factory()), "waiters": 0}
+            self._calls[key] = entry
+            entry["task"].add_done_callback(lambda _task: self._forget(key, entry))
+        else:
+            self.coalesced += 1
+
+        entry["waiters"] += 1
+        try:
+            return await asyncio.shield(entry["task"])
+        finally:
+            entry["waiters"] -= 1
+            if entry["waiters"] == 0 and not entry["task"].done():
+                self._forget(key, entry)
+                entry["task"].cancel()
+
+    def _forget(self, key, entry):
+        if self._calls.get(key) is entry:
+            del self._calls[key]
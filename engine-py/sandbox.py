@@ -5,16 +5,21 @@ Executes AI-generated Python code with two modes controlled by SANDBOX_MODE env
   - "lambda": Use AWS Lambda (default when AWS credentials present)
   - "local":  Use local exec() directly, skip Lambda entirely
 
+Local execution runs in a separate process that is killed outright once the
+timeout passes, so runaway generated code never keeps burning CPU in the service.
+
 If Lambda invocation fails for any reason, always falls back to local execution silently.
 Never crashes the main service.
 """
 
 import os
 import json
+import orjson
 import signal
 import logging
 import threading
 import traceback
+import multiprocessing
 
 logger = logging.getLogger(__name__)
 
@@ -24,21 +29,36 @@ SANDBOX_MODE = os.getenv("SANDBOX_MODE", "lambda").lower()
 LAMBDA_FUNCTION_NAME = os.getenv("LAMBDA_FUNCTION_NAME", "workflow-dynamic-executor")
 LAMBDA_REGION = os.getenv("AWS_REGION", "ap-south-1")
 LOCAL_TIMEOUT_SECONDS = 10
+# Extra time the parent waits for the child's own timeout error before killing it
+LOCAL_KILL_GRACE_SECONDS = 2
+
+# forkserver where available: forking the threaded service process directly is unsafe,
+# and spawn would re-import the app for every run
+_MP_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+if _MP_CONTEXT.get_start_method() == "forkserver":
+    _MP_CONTEXT.set_forkserver_preload([__name__])
 
 
-# ─── Timeout helper (cross-platform: SIGALRM on Linux, threading on Windows) ──
+# ─── Timeout helper (SIGALRM inside the sandbox process on Unix) ────────
 
 class TimeoutError(Exception):
     pass
 
 
+def _can_use_sigalrm() -> bool:
+    """SIGALRM exists only on Unix, and handlers can only be set from the main thread."""
+    return hasattr(signal, "SIGALRM") and threading.current_thread() is threading.main_thread()
+
+
 class timeout_guard:
     """Context manager for execution timeout. Uses signal.alarm on Linux,
     threading-based timeout on Windows."""
 
     def __init__(self, seconds):
         self.seconds = seconds
-        self.use_signal = hasattr(signal, "SIGALRM")
+        self.use_signal = _can_use_sigalrm()
 
     def _handler(self, signum, frame):
         raise TimeoutError(f"Execution timed out after {self.seconds} seconds")
@@ -56,42 +76,13 @@ class timeout_guard:
         return False
 
 
-def _run_with_threading_timeout(fn, args=(), kwargs=None, timeout_seconds=10):
-    """
-    Run a function with a threading-based timeout (works on Windows).
-    Returns (result, error) tuple.
-    """
-    kwargs = kwargs or {}
-    result_holder = [None]
-    error_holder = [None]
-
-    def target():
-        try:
-            result_holder[0] = fn(*args, **kwargs)
-        except Exception as e:
-            error_holder[0] = e
-
-    thread = threading.Thread(target=target, daemon=True)
-    thread.start()
-    thread.join(timeout=timeout_seconds)
-
-    if thread.is_alive():
-        # Thread is still running — timeout exceeded
-        # daemon=True ensures it won't block process exit
-        raise TimeoutError(f"Execution timed out after {timeout_seconds} seconds")
-
-    if error_holder[0] is not None:
-        raise error_holder[0]
-
-    return result_holder[0]
-
-
 # ─── Local Execution ────────────────────────────────────────────────────
 
-def _execute_local(generated_code: str, inputs: dict, context: dict) -> dict:
+def _run_restricted(generated_code: str, inputs: dict, context: dict) -> dict:
     """
-    Execute generated code locally using exec() with a restricted namespace.
-    
+    Execute generated code using exec() with a restricted namespace.
+    Runs inside the sandbox process — see _execute_local.
+
     The generated code must define a `run(inputs, context)` function.
     Only safe imports are allowed: requests, json, re, datetime, bs4.
     """
@@ -217,35 +208,19 @@ def _execute_local(generated_code: str, inputs: dict, context: dict) -> dict:
 
         restricted_locals = {}
 
-        # Determine timeout strategy
-        use_signal = hasattr(signal, "SIGALRM")
-
-        if use_signal:
-            # Linux: use SIGALRM (more reliable, can interrupt network I/O)
-            with timeout_guard(LOCAL_TIMEOUT_SECONDS):
-                exec(generated_code, restricted_globals, restricted_locals)
-
-                run_fn = restricted_locals.get("run")
-                if not run_fn or not callable(run_fn):
-                    return {
-                        "success": False,
-                        "result": None,
-                        "error": "Generated code must define a 'run(inputs, context)' function"
-                    }
-
-                result = run_fn(inputs, context)
-        else:
-            # Windows: use threading-based timeout
-            def _exec_and_run():
-                exec(generated_code, restricted_globals, restricted_locals)
-                run_fn = restricted_locals.get("run")
-                if not run_fn or not callable(run_fn):
-                    raise ValueError("Generated code must define a 'run(inputs, context)' function")
-                return run_fn(inputs, context)
-
-            result = _run_with_threading_timeout(
-                _exec_and_run, timeout_seconds=LOCAL_TIMEOUT_SECONDS
-            )
+        # Soft timeout with a readable error; the parent kills the process if this never fires
+        with timeout_guard(LOCAL_TIMEOUT_SECONDS):
+            exec(generated_code, restricted_globals, restricted_locals)
+
+            run_fn = restricted_locals.get("run")
+            if not run_fn or not callable(run_fn):
+                return {
+                    "success": False,
+                    "result": None,
+                    "error": "Generated code must define a 'run(inputs, context)' function"
+                }
+
+            result = run_fn(inputs, context)
 
         # Validate JSON serializability
         if result is not None:
@@ -277,23 +252,93 @@ def _execute_local(generated_code: str, inputs: dict, context: dict) -> dict:
         }
 
 
+def _sandbox_process_main(conn, generated_code: str, inputs: dict, context: dict) -> None:
+    """Entry point of the sandbox process: run the code and send the result dict back."""
+    try:
+        conn.send(_run_restricted(generated_code, inputs, context))
+    finally:
+        conn.close()
+
+
+def _execute_local(generated_code: str, inputs: dict, context: dict) -> dict:
+    """
+    Execute generated code locally in a child process.
+    The process is terminated (then killed) if it outlives the timeout, so
+    nothing keeps running after we return.
+    """
+    parent_conn, child_conn = _MP_CONTEXT.Pipe(duplex=False)
+    process = _MP_CONTEXT.Process(
+        target=_sandbox_process_main,
+        args=(child_conn, generated_code, inputs, context),
+        name="sandbox-exec",
+    )
+    try:
+        process.start()
+        child_conn.close()
+
+        if not parent_conn.poll(LOCAL_TIMEOUT_SECONDS + LOCAL_KILL_GRACE_SECONDS):
+            return {
+                "success": False,
+                "result": None,
+                "error": f"Execution timed out after {LOCAL_TIMEOUT_SECONDS} seconds"
+            }
+        return parent_conn.recv()
+
+    except EOFError:
+        process.join(LOCAL_KILL_GRACE_SECONDS)
+        return {
+            "success": False,
+            "result": None,
+            "error": f"Sandbox process exited unexpectedly (exit code {process.exitcode})"
+        }
+    except Exception as e:
+        return {
+            "success": False,
+            "result": None,
+            "error": f"{type(e).__name__}: {str(e)}"
+        }
+    finally:
+        if process.is_alive():
+            process.terminate()
+            process.join(LOCAL_KILL_GRACE_SECONDS)
+            if process.is_alive():
+                process.kill()
+        if process.pid is not None:
+            process.join()
+        parent_conn.close()
+
+
 # ─── Lambda Execution ───────────────────────────────────────────────────
 
+_lambda_client = None
+_lambda_client_lock = threading.Lock()
+
+
+def _get_lambda_client():
+    """Lazily create one boto3 Lambda client and reuse it (and its keep-alive pool)
+    across invocations. Locked because boto3's default session isn't thread-safe."""
+    global _lambda_client
+    if _lambda_client is None:
+        with _lambda_client_lock:
+            if _lambda_client is None:
+                import boto3
+                _lambda_client = boto3.client("lambda", region_name=LAMBDA_REGION)
+    return _lambda_client
+
+
 def _execute_lambda(generated_code: str, inputs: dict, context: dict) -> dict:
     """
     Execute generated code via AWS Lambda.
     Returns the Lambda response or raises an exception on failure.
     """
     try:
-        import boto3
-
-        client = boto3.client("lambda", region_name=LAMBDA_REGION)
+        client = _get_lambda_client()
 
-        payload = json.dumps({
+        payload = orjson.dumps({
             "generated_code": generated_code,
             "inputs": inputs,
             "context": context
-        })
+        }, option=orjson.OPT_NON_STR_KEYS)
 
         response = client.invoke(
             FunctionName=LAMBDA_FUNCTION_NAME,
@@ -302,7 +347,7 @@ def _execute_lambda(generated_code: str, inputs: dict, context: dict) -> dict:
         )
 
         # Parse Lambda response
-        response_payload = json.loads(response["Payload"].read().decode("utf-8"))
+        response_payload = orjson.loads(response["Payload"].read())
 
         # Check for Lambda-level errors (function error, not application error)
         if response.get("FunctionError"):
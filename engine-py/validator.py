@@ -10,13 +10,19 @@ Registry-aware validation:
 import logging
 import httpx
 from typing import Tuple, Optional, List
-from config import ALLOWED_STEPS, ALLOWED_TRIGGERS, validate_interval_format
+from config import ALLOWED_STEPS, ALLOWED_STEPS_SET, ALLOWED_TRIGGERS, validate_interval_format
 
 logger = logging.getLogger(__name__)
 
 # ─── Registry-Aware Step List ────────────────────────────────────────────
 
 _dynamic_allowed_steps = None
+_dynamic_allowed_steps_set = frozenset()
+_dynamic_allowed_steps_text = ""
+
+# Joined forms for error messages (built once; unsupported steps are common on retries)
+_ALLOWED_STEPS_TEXT = ", ".join(ALLOWED_STEPS)
+_ALLOWED_TRIGGERS_TEXT = ", ".join(ALLOWED_TRIGGERS)
 
 def get_allowed_steps() -> list:
     """Get allowed steps — from registry if available, else fallback."""
@@ -25,15 +31,33 @@ def get_allowed_steps() -> list:
         return _dynamic_allowed_steps
     return ALLOWED_STEPS
 
+def _allowed_step_set(allowed_steps: list):
+    """Set view of a known step list for O(1) lookups; other lists are used as-is."""
+    if allowed_steps is ALLOWED_STEPS:
+        return ALLOWED_STEPS_SET
+    if allowed_steps is _dynamic_allowed_steps:
+        return _dynamic_allowed_steps_set
+    return allowed_steps
+
+def _allowed_steps_text(allowed_steps: list) -> str:
+    """Comma-joined step list for error messages, precomputed for the known lists."""
+    if allowed_steps is ALLOWED_STEPS:
+        return _ALLOWED_STEPS_TEXT
+    if allowed_steps is _dynamic_allowed_steps:
+        return _dynamic_allowed_steps_text
+    return ", ".join(allowed_steps)
+
 def refresh_allowed_steps(base_url: str = "http://localhost:3000") -> list:
     """Fetch allowed steps from Node.js registry."""
-    global _dynamic_allowed_steps
+    global _dynamic_allowed_steps, _dynamic_allowed_steps_set, _dynamic_allowed_steps_text
     try:
         with httpx.Client(timeout=5.0) as client:
             response = client.get(f"{base_url}/registry/tools")
             response.raise_for_status()
             data = response.json()
             _dynamic_allowed_steps = [t["name"] for t in data.get("tools", [])]
+            _dynamic_allowed_steps_set = frozenset(_dynamic_allowed_steps)
+            _dynamic_allowed_steps_text = ", ".join(_dynamic_allowed_steps)
             logger.info(f"✅ Validator loaded {len(_dynamic_allowed_steps)} allowed steps from registry")
             return _dynamic_allowed_steps
     except Exception as e:
@@ -43,6 +67,10 @@ def refresh_allowed_steps(base_url: str = "http://localhost:3000") -> list:
 
 # ─── Main Validation ─────────────────────────────────────────────────────
 
+# Top-level automation fields and their required types, checked in order
+REQUIRED_TOP_LEVEL_FIELDS = (("name", str), ("trigger", dict), ("steps", list))
+
+
 def validate_automation(data: dict) -> Tuple[bool, Optional[str]]:
     """
     Validate automation JSON structure and content.
@@ -52,19 +80,17 @@ def validate_automation(data: dict) -> Tuple[bool, Optional[str]]:
         (False, error_message) if invalid
     """
     
+    if not isinstance(data, dict):
+        return False, "Automation must be a JSON object"
+    
     # Check for error response from LLM
     if "error" in data:
         return True, None  # Pass through LLM errors
     
     # Required fields
-    if "name" not in data or not isinstance(data["name"], str):
-        return False, "Missing or invalid 'name' field"
-    
-    if "trigger" not in data or not isinstance(data["trigger"], dict):
-        return False, "Missing or invalid 'trigger' field"
-    
-    if "steps" not in data or not isinstance(data["steps"], list):
-        return False, "Missing or invalid 'steps' field"
+    for key, expected_type in REQUIRED_TOP_LEVEL_FIELDS:
+        if not isinstance(data.get(key), expected_type):
+            return False, f"Missing or invalid '{key}' field"
     
     if len(data["steps"]) == 0:
         return False, "Automation must have at least one step"
@@ -91,7 +117,7 @@ def validate_trigger(trigger: dict) -> Tuple[bool, Optional[str]]:
         return False, "Trigger missing 'type' field"
     
     if trigger["type"] not in ALLOWED_TRIGGERS:
-        return False, f"Invalid trigger type: {trigger['type']}. Allowed: {', '.join(ALLOWED_TRIGGERS)}"
+        return False, f"Invalid trigger type: {trigger['type']}. Allowed: {_ALLOWED_TRIGGERS_TEXT}"
     
     # Interval trigger must have 'every' field
     if trigger["type"] == "interval":
@@ -110,6 +136,34 @@ def validate_trigger(trigger: dict) -> Tuple[bool, Optional[str]]:
     return True, None
 
 
+# Step type -> fields that must be present (one dict lookup instead of an if/elif chain)
+_SHEET_FIELDS = ("spreadsheetId", "range")
+STEP_REQUIRED_FIELDS = {
+    "fetch_stock_price": ("symbol",),
+    "fetch_crypto_price": ("symbol",),
+    "send_email": ("to",),
+    "send_whatsapp": ("to", "message"),
+    "send_sms": ("to", "message"),
+    "send_discord": ("webhook_url", "message"),
+    "send_slack": ("webhook_url", "message"),
+    "job_search": ("query",),
+    "condition": ("if",),
+    "scrape_reddit": ("subreddit",),
+    "scrape_twitter": ("username",),
+    "http_request": ("url",),
+    "fetch_rss_feed": ("url",),
+    "ai_summarize": ("text",),
+    "read_google_sheet": _SHEET_FIELDS,
+    "write_google_sheet": _SHEET_FIELDS,
+    "append_google_sheet": _SHEET_FIELDS,
+}
+
+# Extra guidance appended to specific missing-field errors (fed back to the LLM on retry)
+_REQUIRED_FIELD_HINTS = {
+    ("condition", "if"): " field (not 'condition')",
+}
+
+
 def validate_step(step: dict, allowed_steps: list = None) -> Tuple[bool, Optional[str]]:
     """Validate a single step against allowed steps."""
     
@@ -123,81 +177,17 @@ def validate_step(step: dict, allowed_steps: list = None) -> Tuple[bool, Optiona
         return False, "Step missing 'type' field"
     
     step_type = step["type"]
+    if not isinstance(step_type, str):
+        return False, "Step 'type' must be a string"
     
     # Check against allowed steps (ANTI-HALLUCINATION)
-    if step_type not in allowed_steps:
-        return False, f"Unsupported step type: '{step_type}'. Allowed types: {', '.join(allowed_steps)}"
+    if step_type not in _allowed_step_set(allowed_steps):
+        return False, f"Unsupported step type: '{step_type}'. Allowed types: {_allowed_steps_text(allowed_steps)}"
     
     # Validate step-specific required fields
-    if step_type == "fetch_stock_price":
-        if "symbol" not in step:
-            return False, "fetch_stock_price requires 'symbol'"
-    
-    elif step_type == "fetch_crypto_price":
-        if "symbol" not in step:
-            return False, "fetch_crypto_price requires 'symbol'"
-    
-    elif step_type == "send_email":
-        if "to" not in step:
-            return False, "send_email requires 'to'"
-    
-    elif step_type == "send_whatsapp":
-        if "to" not in step:
-            return False, "send_whatsapp requires 'to'"
-        if "message" not in step:
-            return False, "send_whatsapp requires 'message'"
-    
-    elif step_type == "send_sms":
-        if "to" not in step:
-            return False, "send_sms requires 'to'"
-        if "message" not in step:
-            return False, "send_sms requires 'message'"
-    
-    elif step_type == "send_discord":
-        if "webhook_url" not in step:
-            return False, "send_discord requires 'webhook_url'"
-        if "message" not in step:
-            return False, "send_discord requires 'message'"
-    
-    elif step_type == "send_slack":
-        if "webhook_url" not in step:
-            return False, "send_slack requires 'webhook_url'"
-        if "message" not in step:
-            return False, "send_slack requires 'message'"
-    
-    elif step_type == "job_search":
-        if "query" not in step:
-            return False, "job_search requires 'query'"
-    
-    elif step_type == "condition":
-        if "if" not in step:
-            return False, "condition requires 'if' field (not 'condition')"
-    
-    elif step_type == "scrape_reddit":
-        if "subreddit" not in step:
-            return False, "scrape_reddit requires 'subreddit'"
-    
-    elif step_type == "scrape_twitter":
-        if "username" not in step:
-            return False, "scrape_twitter requires 'username'"
-    
-    elif step_type == "http_request":
-        if "url" not in step:
-            return False, "http_request requires 'url'"
-    
-    elif step_type == "fetch_rss_feed":
-        if "url" not in step:
-            return False, "fetch_rss_feed requires 'url'"
-    
-    elif step_type == "ai_summarize":
-        if "text" not in step:
-            return False, "ai_summarize requires 'text'"
-    
-    elif step_type in ("read_google_sheet", "write_google_sheet", "append_google_sheet"):
-        if "spreadsheetId" not in step:
-            return False, f"{step_type} requires 'spreadsheetId'"
-        if "range" not in step:
-            return False, f"{step_type} requires 'range'"
+    for field in STEP_REQUIRED_FIELDS.get(step_type, ()):
+        if field not in step:
+            return False, f"{step_type} requires '{field}'{_REQUIRED_FIELD_HINTS.get((step_type, field), '')}"
     
     return True, None
 